@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from api.config import logger
+from api.Logic.AI.event_router import OpenAIEventRouter
+from api.Logic.AI.setup import (
+    connect_to_openai,
+    STATIC_SESSION_UPDATE,
+    send_session_update,
+)
+
+POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "4"))  # Idle sessions kept ready
+POOL_MAX_AGE = int(os.getenv("OPENAI_POOL_MAX_AGE", "600"))  # Seconds, then recycled
+POOL_HEALTH_INTERVAL = 15  # Seconds between pings of idle sessions
+POOL_PING_TIMEOUT = 3
+
+
+class _PooledSession:
+    def __init__(self, openai_router):
+        self.router = openai_router
+        self.created_at = time.monotonic()
+
+    def healthy(self, max_age):
+        return (
+            self.router.close_code is None
+            and time.monotonic() - self.created_at < max_age
+        )
+
+
+class OpenAIConnectionPool:
+    """
+    Keeps a number of connected, pre-configured OpenAI Realtime sessions idle,
+    so a call never waits on the TLS and websocket handshakes.
+    Idle sessions are pinged periodically and recycled after `max_age`.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_age=POOL_MAX_AGE):
+        self.size = size
+        self.max_age = max_age
+        self._idle = []
+        self._opening = 0
+        self._refill = asyncio.Event()
+        self._task = None
+        self._fill_tasks = set()
+
+    async def start(self):
+        """Starts the maintenance task that keeps the pool filled."""
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._maintain())
+            self._refill.set()
+
+    async def stop(self):
+        """Stops maintenance and closes every idle session."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await session.router.close()
+
+    async def claim(self):
+        """
+        Returns a ready OpenAIEventRouter, taking an idle pooled session when one
+        is healthy and connecting a new one otherwise. Returns None on failure.
+        """
+        while self._idle:
+            session = self._idle.pop()
+            self._refill.set()
+            if session.healthy(self.max_age):
+                logger.debug("Claimed pre-warmed OpenAI session.")
+                return session.router
+            await session.router.close()
+
+        self._refill.set()
+        logger.warning("OpenAI pool empty. Connecting on demand.")
+        return await self._open(retries=5)
+
+    async def _open(self, retries=1):
+        openai_ws = await connect_to_openai(retries=retries)
+        if not openai_ws:
+            return None
+        openai_router = OpenAIEventRouter(openai_ws)
+        openai_router.start()
+        try:
+            # Shared settings are applied now; instructions are added on claim
+            await openai_router.request(
+                STATIC_SESSION_UPDATE, expect="session.updated"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to pre-configure OpenAI session: {e}")
+            await openai_router.close()
+            return None
+        return openai_router
+
+    async def _fill_one(self):
+        try:
+            openai_router = await self._open()
+            if openai_router:
+                self._idle.append(_PooledSession(openai_router))
+        finally:
+            self._opening -= 1
+
+    async def _check_idle(self):
+        for session in list(self._idle):
+            healthy = session.healthy(self.max_age)
+            if healthy:
+                try:
+                    pong = await session.router.ws.ping()
+                    await asyncio.wait_for(pong, POOL_PING_TIMEOUT)
+                except Exception:
+                    healthy = False
+            if not healthy and session in self._idle:
+                self._idle.remove(session)
+                await session.router.close()
+                logger.debug("Recycled stale OpenAI session from pool.")
+
+    async def _maintain(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._refill.wait(), POOL_HEALTH_INTERVAL)
+            except asyncio.TimeoutError:
+                await self._check_idle()
+            self._refill.clear()
+
+            missing = self.size - len(self._idle) - self._opening
+            for _ in range(max(0, missing)):
+                self._opening += 1
+                task = asyncio.create_task(self._fill_one())
+                self._fill_tasks.add(task)
+                task.add_done_callback(self._fill_tasks.discard)
+
+
+openai_pool = OpenAIConnectionPool()
+
+# call_id -> task resolving to an OpenAIEventRouter already configured for the call
+prepared_sessions = {}
+
+
+async def _prepare(call_metadata):
+    openai_router = await openai_pool.claim()
+    if openai_router:
+        await send_session_update(openai_router, call_metadata)
+    return openai_router
+
+
+def prepare_session(call_id, call_metadata):
+    """
+    Claims and configures an OpenAI session for a call ahead of its media stream,
+    e.g. while the phone is still ringing.
+    """
+    if call_id not in prepared_sessions:
+        prepared_sessions[call_id] = asyncio.create_task(_prepare(call_metadata))
+
+
+async def take_session(call_id, call_metadata):
+    """
+    Returns the OpenAI session prepared for a call, preparing one now if needed.
+    """
+    prepare_session(call_id, call_metadata)
+    task = prepared_sessions.pop(call_id)
+    try:
+        return await task
+    except Exception as e:
+        logger.error(f"Error preparing OpenAI session for call {call_id}: {e}")
+        return None
+
+
+async def discard_session(call_id):
+    """Closes a prepared session that was never used (e.g. call not answered)."""
+    task = prepared_sessions.pop(call_id, None)
+    if task is None:
+        return
+    try:
+        openai_router = await task
+    except Exception:
+        return
+    if openai_router:
+        await openai_router.close()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import uuid
+from api.config import logger
+
+
+class OpenAIEventError(Exception):
+    """Raised when OpenAI answers a client event with an `error` event."""
+
+    def __init__(self, error):
+        self.error = error
+        super().__init__(error.get("message", "Unknown OpenAI error"))
+
+
+class _Waiter:
+    def __init__(self, event_types, predicate, consume):
+        self.event_types = event_types
+        self.predicate = predicate
+        self.consume = consume
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class OpenAIEventRouter:
+    """
+    Owns the only reader of an OpenAI Realtime websocket.
+
+    Every server event is parsed once and then:
+      - passed to the handlers registered for its type with `on()`,
+      - used to resolve a pending `request()`/`wait_for()` future,
+      - queued for the main consumer, which iterates the router with `async for`.
+
+    Nothing else may call `recv()` on the socket, so replies to session updates,
+    truncations and tool outputs never steal audio deltas from the stream.
+    """
+
+    def __init__(self, openai_ws):
+        self.ws = openai_ws
+        self.events = asyncio.Queue()
+        self._handlers = {}
+        self._waiters = {}  # event_id -> _Waiter, in registration order
+        self._task = None
+
+    @property
+    def close_code(self):
+        return self.ws.close_code
+
+    def start(self):
+        """Starts the reader task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._read())
+        return self._task
+
+    def on(self, event_type, handler):
+        """Registers a synchronous handler for an event type."""
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    async def send(self, event):
+        """Sends a client event without waiting for a reply."""
+        await self.ws.send(event if isinstance(event, str) else json.dumps(event))
+
+    def wait_for(self, event_types, predicate=None, consume=False, event_id=None):
+        """
+        Registers interest in the next event of the given type(s) and returns
+        its future. Register before sending whatever triggers the event.
+        If `consume` is set, the matched event is not queued for the main consumer.
+        """
+        if isinstance(event_types, str):
+            event_types = (event_types,)
+        event_id = event_id or f"event_{uuid.uuid4().hex}"
+        waiter = _Waiter(event_types, predicate, consume)
+        self._waiters[event_id] = waiter
+        waiter.future.add_done_callback(lambda _: self._waiters.pop(event_id, None))
+        return waiter.future
+
+    async def request(
+        self,
+        event,
+        expect,
+        timeout=5.0,
+        consume=False,
+        event_id=None,
+        predicate=None,
+    ):
+        """
+        Sends a client event and waits for the reply of type `expect`
+        (optionally the first one matching `predicate`).
+        The event is tagged with an event_id so an `error` event about it
+        fails this request instead of the stream. Pre-serialized events must
+        already contain the `event_id` passed in.
+        """
+        if isinstance(event, dict):
+            event_id = event.setdefault("event_id", f"event_{uuid.uuid4().hex}")
+        future = self.wait_for(
+            expect, predicate=predicate, consume=consume, event_id=event_id
+        )
+        try:
+            await self.send(event)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+
+    async def close(self):
+        """Closes the websocket and stops the reader."""
+        try:
+            if self.ws.close_code is None:
+                await self.ws.close()
+        finally:
+            if self._task:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+
+    async def __aiter__(self):
+        while True:
+            event = await self.events.get()
+            if event is None:
+                return
+            yield event
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                self._dispatch(json.loads(message))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading OpenAI events: {e}")
+        finally:
+            for waiter in list(self._waiters.values()):
+                if not waiter.future.done():
+                    waiter.future.set_exception(
+                        ConnectionError("OpenAI WebSocket closed.")
+                    )
+            self.events.put_nowait(None)
+
+    def _dispatch(self, event):
+        event_type = event.get("type")
+
+        for handler in self._handlers.get(event_type, ()):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Error in OpenAI event handler for {event_type}: {e}")
+
+        if event_type == "error":
+            error = event.get("error", {})
+            waiter = self._waiters.get(error.get("event_id"))
+            if waiter and not waiter.future.done():
+                waiter.future.set_exception(OpenAIEventError(error))
+                return
+
+        for waiter in list(self._waiters.values()):
+            if event_type not in waiter.event_types or waiter.future.done():
+                continue
+            if waiter.predicate and not waiter.predicate(event):
+                continue
+            waiter.future.set_result(event)
+            if waiter.consume:
+                return
+            break
+
+        self.events.put_nowait(event)
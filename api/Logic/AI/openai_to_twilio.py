@@ -1,27 +1,61 @@
-import json
-import base64
 import asyncio
+import time
 from api.config import logger
-from api.Logic.AI.speech_helpers import handle_speech_started_event
-from api.Logic.AI.tool_helpers import handle_tool_call
-
-
-async def openai_to_twilio_stream(twilio_ws, openai_ws, stream_context):
+from api.Utilities.hot_logging import hot_path, FrameSampler
+from api.Logic.Telephony.media_codec import (
+    build_twilio_media_prefix,
+    build_twilio_media,
+    build_twilio_mark,
+)
+from api.Logic.Telephony.outbound_pacer import OutboundAudioPacer, PACE_OUTBOUND_AUDIO
+from api.Logic.AI.speech_helpers import interrupt_assistant
+from api.Logic.AI.tool_helpers import answer_tool_calls, extract_tool_calls
+from api.Utilities.metrics import (
+    FIRST_AUDIO,
+    LINE_EVENTS,
+    OUTBOUND_FRAMES_DROPPED,
+    STREAM_ERRORS,
+    TURN_LATENCY,
+)
+from api.Logic.Telephony.twilio_socket import twilio_connected
+
+
+async def openai_to_twilio_stream(twilio_ws, openai_router, stream_context):
     """
     Handles real-time streaming of AI-generated speech directly from OpenAI to Twilio.
     Processes OpenAI tool calls and forwards AI-generated audio immediately to Twilio.
+    Events come from the connection's OpenAIEventRouter, the only socket reader.
     """
+    call_metrics = stream_context["metrics"]
     await stream_context["stream_ready"].wait()
     stream_sid = stream_context["stream_sid"]
     logger.debug(f"Twilio streamSid set: {stream_sid}")
+    media_prefix = build_twilio_media_prefix(stream_sid)
+    # Consumers that need the audio itself (recording, metrics) register here
+    # and receive the base64 delta; decoding is left to them.
+    audio_taps = stream_context.setdefault("outbound_audio_taps", [])
+
+    # Records what the caller actually hears: paced frames as they are sent
+    recording = stream_context.get("recording")
+    pacer = None
+    if PACE_OUTBOUND_AUDIO and twilio_ws:
+        pacer = OutboundAudioPacer(
+            twilio_ws, stream_sid, on_frame=recording.outbound if recording else None
+        )
+        pacer.start()
+    elif recording:
+        audio_taps.append(recording.outbound_delta)
+    stream_context["outbound_pacer"] = pacer
+    mark_count = 0
+    sampler = FrameSampler("OpenAI → Twilio")
+    first_audio_seen = False
 
     try:
-        async for openai_message in openai_ws:
-            logger.debug(f"Received OpenAI message: {openai_message}")
-            response = json.loads(openai_message)
+        async for response in openai_router:
             response_type = response.get("type", "UNKNOWN")
 
-            logger.debug(f"Received OpenAI event: {response_type}")
+            if hot_path.debug and response_type != "response.audio.delta":
+                logger.debug("Received OpenAI event: %s", response_type)
 
             if response_type == "error":
                 logger.error(f"OpenAI returned an error: {response}")
@@ -29,82 +63,91 @@ async def openai_to_twilio_stream(twilio_ws, openai_ws, stream_context):
 
             # Handle function calls (e.g., tools)
             if response_type == "response.done":
-                active_twilio_ws = (
-                    twilio_ws if twilio_ws and twilio_ws.client_state == 1 else None
-                )
-                tool_responses = await handle_tool_call(
-                    response, active_twilio_ws, stream_context
-                )
-                for tool_response in tool_responses:
-                    await openai_ws.send(json.dumps(tool_response))
-                    res = await openai_ws.recv()
-                    logger.debug(f"OpenAI response to tool call: {res}")
-                    logger.debug(f"Tool response sent: {tool_response}")
+                if extract_tool_calls(response):
+                    task = asyncio.create_task(
+                        answer_tool_calls(
+                            openai_router,
+                            response,
+                            twilio_ws if twilio_connected(twilio_ws) else None,
+                            stream_context,
+                        )
+                    )
+                    background_tasks = stream_context.setdefault(
+                        "background_tasks", set()
+                    )
+                    background_tasks.add(task)
+                    task.add_done_callback(background_tasks.discard)
                 continue  # Skip further processing
 
             # Handle AI-generated audio and send it to Twilio immediately
             elif response_type == "response.audio.delta" and "delta" in response:
-                logger.debug(f"Processing OpenAI response.audio.delta")
-
-                # Convert AI-generated speech into Twilio's format
-                audio_payload = base64.b64encode(
-                    base64.b64decode(response["delta"])
-                ).decode("utf-8")
-
-                twilio_audio = {
-                    "event": "media",
-                    "streamSid": stream_sid,
-                    "media": {"payload": audio_payload},
-                }
-
-                # Send directly to Twilio in real-time
-                if twilio_ws:
-                    await twilio_ws.send_json(twilio_audio)
-                    logger.debug(
-                        f"Sent {len(audio_payload)} bytes of AI-generated audio to Twilio."
+                # Both sides use g711_ulaw, so the base64 delta is forwarded untouched
+                audio_payload = response["delta"]
+                item_id = response.get("item_id")
+                if item_id == stream_context.get("interrupted_item"):
+                    continue  # Late delta from a response the caller cut off
+                sampler.frame(len(audio_payload))
+                for tap in audio_taps:
+                    tap(audio_payload)
+
+                # First delta of a new response item starts its playback clock
+                if item_id != stream_context.get("last_assistant_item"):
+                    stream_context["last_assistant_item"] = item_id
+                    stream_context["response_start_timestamp_twilio"] = (
+                        stream_context.get("latest_media_timestamp", 0)
+                    )
+                    mark_count = 0
+
+                    now = time.perf_counter()
+                    if not first_audio_seen:
+                        first_audio_seen = True
+                        call_metrics.observe(FIRST_AUDIO, now - call_metrics.started_at)
+                    speech_stopped_at = stream_context.pop("speech_stopped_at", None)
+                    if speech_stopped_at is not None:
+                        call_metrics.observe(TURN_LATENCY, now - speech_stopped_at)
+
+                if pacer:
+                    # Paced playout in 20 ms frames
+                    pacer.push(item_id, audio_payload)
+                elif twilio_ws:
+                    # Send directly to Twilio in real-time
+                    await twilio_ws.send_text(
+                        build_twilio_media(media_prefix, audio_payload)
                     )
                 else:
+                    call_metrics.count("outbound_dropped", OUTBOUND_FRAMES_DROPPED)
                     logger.warning(
                         "Twilio WebSocket is closed. Skipping audio transmission."
                     )
+                    continue
+
+                # Mark the end of this delta so Twilio confirms when it was played
+                mark_count += 1
+                mark_name = f"{item_id}:{mark_count}"
+                stream_context["mark_queue"].append(mark_name)
+                if pacer:
+                    pacer.mark(mark_name)
+                else:
+                    await twilio_ws.send_text(build_twilio_mark(stream_sid, mark_name))
 
             elif response_type == "input_audio_buffer.speech_started":
                 logger.info("User started speaking. Interrupting AI response.")
-
-                # Retrieve stored values from stream_context
-                last_assistant_item = stream_context.get("last_assistant_item")
-                latest_media_timestamp = stream_context.get("latest_media_timestamp")
-                response_start_timestamp_twilio = stream_context.get(
-                    "response_start_timestamp_twilio"
-                )
-
-                active_twilio_ws = (
-                    twilio_ws if twilio_ws and twilio_ws.client_state == 1 else None
-                )
-
-                # Call function with correct parameters
-                last_assistant_item, response_start_timestamp_twilio = (
-                    await handle_speech_started_event(
-                        openai_ws,
-                        active_twilio_ws,
-                        last_assistant_item,
-                        latest_media_timestamp,
-                        response_start_timestamp_twilio,
-                        stream_context,
-                    )
-                )
-
-                # Update stream_context with the latest state
-                stream_context["last_assistant_item"] = last_assistant_item
-                stream_context["response_start_timestamp_twilio"] = (
-                    response_start_timestamp_twilio
-                )
+                await interrupt_assistant(openai_router, twilio_ws, stream_context)
 
             elif response_type == "input_audio_buffer.speech_stopped":
+                # Start of the turn-latency clock for the reply
+                stream_context["speech_stopped_at"] = time.perf_counter()
                 logger.info("🔇 OpenAI detected user speech stopped.")
 
             elif response_type == "input_audio_buffer.speech_too_quiet":
+                call_metrics.count(
+                    "speech_too_quiet", LINE_EVENTS.labels("speech_too_quiet")
+                )
                 logger.info("🔇 OpenAI detected user speech too quiet.")
 
     except Exception as e:
+        STREAM_ERRORS.labels("openai_to_twilio").inc()
         logger.error(f"Error in openai_to_twilio_stream: {e}")
+    finally:
+        if pacer:
+            await pacer.stop()
@@ -1,13 +1,49 @@
 from api.config import logger, OPENAI_API_KEY, MODEL, VOICE, get_system_message
 from api.Tools.inventory import SYSTEM_TOOLS
+from api.Logic.AI.tool_helpers import POST_CALL_TOOLS
+from api.Tools.appointment_store import appointment_store
+from api.Utilities.date_conversions import remove_booked_slots
+from api.Utilities.metrics import SESSION_UPDATE
 import asyncio
+import logging
+import os
+import time
+import uuid
 import websockets
 import json
 
+# Overridable so benchmarks can point sessions at a local fake Realtime server
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime"
+)
+# Transcribes the caller's audio so every call leaves a stored transcript
+INPUT_TRANSCRIPTION_MODEL = "whisper-1"
+POST_CALL_INSTRUCTIONS = (
+    "You process finished phone calls. For each call you are given its transcript "
+    "and details; respond only by calling the requested tools."
+)
+TURN_DETECTION = {
+    "type": "server_vad",
+    "threshold": 0.3,
+    "prefix_padding_ms": 1000,
+    "silence_duration_ms": 700,
+    "create_response": True,
+}
+# Local VAD defaults; a call's `local_vad` settings override them
+LOCAL_VAD = {
+    "mode": os.getenv("LOCAL_VAD_MODE", "off"),  # off, thin or suppress
+    "threshold_dbfs": float(os.getenv("LOCAL_VAD_THRESHOLD_DBFS", "-40")),
+    "keepalive_ms": 500,
+    "barge_in": os.getenv("LOCAL_VAD_BARGE_IN", "0") == "1",
+    "barge_in_ms": 200,
+}
+# Silence forwarded after speech beyond what the server VAD needs to end a turn
+LOCAL_VAD_HANGOVER_MARGIN_MS = 300
+
 
 async def connect_to_openai(retries=5, backoff_factor=1.5):
     """Retries connection with exponential backoff."""
-    url = f"wss://api.openai.com/v1/realtime?model={MODEL}"
+    url = f"{OPENAI_REALTIME_URL}?model={MODEL}"
     headers = [
         ("Authorization", f"Bearer {OPENAI_API_KEY}"),
         ("OpenAI-Beta", "realtime=v1"),
@@ -28,50 +64,130 @@ async def connect_to_openai(retries=5, backoff_factor=1.5):
     return None
 
 
-def build_session_update(call_metadata):
+def build_session_config():
     """
-    Constructs the session update payload for OpenAI.
+    Constructs the session settings shared by every call (everything but the
+    per-call instructions). Used to pre-configure pooled connections.
+    """
+    return {
+        "turn_detection": TURN_DETECTION,
+        "input_audio_format": "g711_ulaw",  # Matches Twilio's format
+        "input_audio_transcription": {"model": INPUT_TRANSCRIPTION_MODEL},
+        "output_audio_format": "g711_ulaw",  # Ensures AI responds in compatible format
+        "voice": VOICE,
+        "modalities": ["text", "audio"],  # Allow both text and audio responses
+        "temperature": 0.8,
+        "tools": SYSTEM_TOOLS,
+        "tool_choice": "auto",
+    }
+
+
+def build_local_vad_settings(call_metadata):
+    """
+    Returns a call's local VAD settings: the defaults, the call's overrides,
+    and timings derived from the server VAD so its turns still end.
+    """
+    settings = {**LOCAL_VAD, "hangover_ms": None, "prefix_padding_ms": None}
+    settings.update(
+        (key, value)
+        for key, value in (call_metadata.get("local_vad") or {}).items()
+        if value is not None
+    )
+    if settings["hangover_ms"] is None:
+        settings["hangover_ms"] = (
+            TURN_DETECTION["silence_duration_ms"] + LOCAL_VAD_HANGOVER_MARGIN_MS
+        )
+    if settings["prefix_padding_ms"] is None:
+        settings["prefix_padding_ms"] = TURN_DETECTION["prefix_padding_ms"]
+    return settings
+
+
+def build_post_call_session_update():
+    """
+    Constructs the session update for offline post-call workers: text only,
+    no turn detection, and only the post-call tools.
     """
     return {
         "type": "session.update",
         "session": {
-            "turn_detection": {
-                "type": "server_vad",
-                "threshold": 0.3,
-                "prefix_padding_ms": 1000,
-                "silence_duration_ms": 700,
-                "create_response": True,
-            },
-            "input_audio_format": "g711_ulaw",  # Matches Twilio's format
-            "output_audio_format": "g711_ulaw",  # Ensures AI responds in compatible format
-            "voice": VOICE,
-            "instructions": get_system_message(call_metadata),  # Get AI instructions
-            "modalities": ["text", "audio"],  # Allow both text and audio responses
-            "temperature": 0.8,
-            "tools": SYSTEM_TOOLS,
-            "tool_choice": "auto",
+            "turn_detection": None,
+            "modalities": ["text"],
+            "instructions": POST_CALL_INSTRUCTIONS,
+            "temperature": 0.6,
+            "tools": [
+                tool for tool in SYSTEM_TOOLS if tool["name"] in POST_CALL_TOOLS
+            ],
+            "tool_choice": "required",
         },
     }
 
 
-async def send_session_update(openai_ws, call_metadata):
+# Shared settings serialized once at startup; per-call JSON is spliced in after them
+STATIC_SESSION_JSON = json.dumps(build_session_config(), separators=(",", ":"))
+STATIC_SESSION_UPDATE = (
+    '{"type":"session.update","session":' + STATIC_SESSION_JSON + "}"
+)
+_SESSION_UPDATE_PREFIX = '{"type":"session.update","event_id":'
+_SESSION_PREFIX = ',"session":' + STATIC_SESSION_JSON[:-1] + ',"instructions":'
+
+
+def render_instructions(call_metadata):
+    """
+    Returns the serialized instructions for a call.
+    Rendered on every call: they carry per-call ids and the slots still free.
+    """
+    return json.dumps(get_system_message(call_metadata))
+
+
+def build_session_update_message(call_metadata, event_id):
+    """
+    Builds the serialized session.update for a call from the static prefix
+    and the rendered instructions, ready to send in a single frame.
+    """
+    return (
+        _SESSION_UPDATE_PREFIX
+        + json.dumps(event_id)
+        + _SESSION_PREFIX
+        + render_instructions(call_metadata)
+        + "}}"
+    )
+
+
+async def send_session_update(openai_router, call_metadata):
     """
     Sends a session update to OpenAI's real-time API.
+    Waits for `session.updated` through the event router instead of calling recv().
     """
 
-    if openai_ws is None or openai_ws.close_code is not None:
+    if openai_router is None or openai_router.close_code is not None:
         logger.error("OpenAI WebSocket is closed. Cannot send session update.")
         return None
 
-    session_update = build_session_update(call_metadata)
+    # Offer only slots nobody has booked with the company since the call was made
+    availability = call_metadata.get("availability")
+    if availability:
+        try:
+            booked = await appointment_store.find(company=call_metadata.get("company"))
+            call_metadata = {
+                **call_metadata,
+                "availability": remove_booked_slots(availability, booked),
+            }
+        except Exception as e:
+            logger.error(f"Error removing booked appointment slots: {e}")
+
+    event_id = f"event_{uuid.uuid4().hex}"
+    session_update = build_session_update_message(call_metadata, event_id)
 
     try:
-        logger.debug(f"Sending session update: {json.dumps(session_update, indent=2)}")
-        await openai_ws.send(json.dumps(session_update))
-        logger.debug("Session update sent successfully.")
-
-        # Receive response from OpenAI
-        res = await openai_ws.recv()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Sending session update: {json.dumps(json.loads(session_update), indent=2)}"
+            )
+        started = time.perf_counter()
+        res = await openai_router.request(
+            session_update, expect="session.updated", event_id=event_id
+        )
+        SESSION_UPDATE.observe(time.perf_counter() - started)
         logger.debug(f"OpenAI response to session update: {res}")
         return res
 
@@ -1,23 +1,32 @@
 from api.config import logger
+from api.Utilities.metrics import INTERRUPTION_CLEAR
 import asyncio
-import json
+import time
+from api.Logic.Telephony.twilio_socket import twilio_connected
 
 
-async def detect_speech_interruption(
-    last_assistant_item, latest_media_timestamp, response_start_timestamp_twilio
+def detect_speech_interruption(
+    last_assistant_item,
+    latest_media_timestamp,
+    response_start_timestamp_twilio,
+    mark_queue=None,
 ):
     """
     Checks if the user has started speaking and determines if AI should be interrupted.
     Returns whether truncation should occur and the adjusted elapsed time.
+    An empty mark queue means Twilio has already played everything sent,
+    so there is nothing left to interrupt.
     """
     logger.debug(
         f"User speech detected. Checking if AI should be interrupted... {latest_media_timestamp}, {response_start_timestamp_twilio}"
     )
 
-    await asyncio.sleep(0.01)  # Prevents over-sensitivity
-
-    if last_assistant_item and response_start_timestamp_twilio is not None:
-        elapsed_time = latest_media_timestamp - response_start_timestamp_twilio
+    if (
+        last_assistant_item
+        and response_start_timestamp_twilio is not None
+        and (mark_queue is None or mark_queue)
+    ):
+        elapsed_time = (latest_media_timestamp or 0) - response_start_timestamp_twilio
         logger.debug(
             f"Truncating AI response at {elapsed_time}ms due to user interruption."
         )
@@ -32,7 +41,7 @@ async def detect_speech_interruption(
         return False, None
 
 
-async def truncate_openai_response(openai_ws, last_assistant_item, elapsed_time):
+async def truncate_openai_response(openai_router, last_assistant_item, elapsed_time):
     """
     Sends a truncation event to OpenAI and waits for confirmation.
     """
@@ -44,13 +53,11 @@ async def truncate_openai_response(openai_ws, last_assistant_item, elapsed_time)
     }
 
     try:
-        await openai_ws.send(json.dumps(truncate_event))
-        logger.debug("Truncation event successfully sent to OpenAI.")
-
-        openai_response = await openai_ws.recv()
+        openai_response = await openai_router.request(
+            truncate_event, expect="conversation.item.truncated"
+        )
         logger.debug(f"OpenAI response to truncation: {openai_response}")
-
-        return "conversation.item.truncated" in openai_response
+        return True
 
     except Exception as e:
         logger.error(f"Error sending truncation event to OpenAI: {str(e)}")
@@ -70,7 +77,7 @@ async def clear_twilio_audio_buffer(twilio_ws, stream_context):
 
 
 async def handle_speech_started_event(
-    openai_ws,
+    openai_router,
     twilio_ws,
     last_assistant_item,
     latest_media_timestamp,
@@ -79,22 +86,67 @@ async def handle_speech_started_event(
 ):
     """
     Handles AI speech truncation when the user starts speaking.
+    Playback is cleared first so the caller stops hearing the AI immediately,
+    then OpenAI is told how much of the response was actually heard.
     """
-    should_truncate, elapsed_time = await detect_speech_interruption(
-        last_assistant_item, latest_media_timestamp, response_start_timestamp_twilio
+    started = time.perf_counter()
+    mark_queue = stream_context.get("mark_queue")
+    should_truncate, elapsed_time = detect_speech_interruption(
+        last_assistant_item,
+        latest_media_timestamp,
+        response_start_timestamp_twilio,
+        mark_queue,
     )
 
-    if should_truncate:
-        success = await truncate_openai_response(
-            openai_ws, last_assistant_item, elapsed_time
-        )
-        if success:
-            # Ensure Twilio WebSocket is still active before clearing buffer
-            if twilio_ws and twilio_ws.client_state == 1:
-                await clear_twilio_audio_buffer(twilio_ws, stream_context)
-            else:
-                logger.warning("Twilio WebSocket is closed. Cannot clear audio buffer.")
+    if not should_truncate:
+        return last_assistant_item, response_start_timestamp_twilio
+
+    # When outbound audio is paced, the pacer knows exactly what was played
+    pacer = stream_context.get("outbound_pacer")
+    if pacer:
+        elapsed_time = pacer.played_ms(last_assistant_item)
+        pacer.flush()
+
+    # Ensure Twilio WebSocket is still active before clearing buffer
+    if twilio_connected(twilio_ws):
+        await clear_twilio_audio_buffer(twilio_ws, stream_context)
+        call_metrics = stream_context.get("metrics")
+        if call_metrics:
+            call_metrics.observe(INTERRUPTION_CLEAR, time.perf_counter() - started)
+    else:
+        logger.warning("Twilio WebSocket is closed. Cannot clear audio buffer.")
+    if mark_queue is not None:
+        mark_queue.clear()
+    stream_context["interrupted_item"] = last_assistant_item
+
+    # Confirmation is awaited off the event loop's audio path
+    task = asyncio.create_task(
+        truncate_openai_response(openai_router, last_assistant_item, elapsed_time)
+    )
+    background_tasks = stream_context.setdefault("background_tasks", set())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
 
-        return None, None
+    return None, None
 
-    return last_assistant_item, response_start_timestamp_twilio
+
+async def interrupt_assistant(openai_router, twilio_ws, stream_context):
+    """
+    Interrupts whatever the AI is saying, using the playback state kept in
+    stream_context. Called on OpenAI's speech_started, and earlier by the
+    local VAD's barge-in when it is enabled; once a response is cut off,
+    the later call finds nothing to interrupt.
+    """
+    twilio_ws = twilio_ws if twilio_connected(twilio_ws) else None
+    last_assistant_item, response_start_timestamp_twilio = (
+        await handle_speech_started_event(
+            openai_router,
+            twilio_ws,
+            stream_context.get("last_assistant_item"),
+            stream_context.get("latest_media_timestamp"),
+            stream_context.get("response_start_timestamp_twilio"),
+            stream_context,
+        )
+    )
+    stream_context["last_assistant_item"] = last_assistant_item
+    stream_context["response_start_timestamp_twilio"] = response_start_timestamp_twilio
@@ -1,7 +1,14 @@
 from api.config import logger
 import asyncio
 import json
-from api.Tools.tools import scheduled_appointment, write_call_summary, end_call
+import time
+from api.Tools.registry import TOOLS
+import api.Tools.tools  # noqa: F401  Registers the tool handlers
+from api.Logic.Telephony.twilio_socket import twilio_connected
+from api.Utilities.metrics import TOOL_DURATION, TOOL_ERRORS
+
+POST_CALL_TIMEOUT = 30.0  # Upper bound on the model's post-call response
+POST_CALL_TOOLS = tuple(name for name, tool in TOOLS.items() if tool.post_call_only)
 
 
 def extract_tool_calls(response):
@@ -17,131 +24,149 @@ def extract_tool_calls(response):
     return function_calls
 
 
+def build_tool_output(function_call_id, output):
+    """Wraps a tool's output as the conversation item OpenAI expects."""
+    return {
+        "type": "conversation.item.create",
+        "item": {
+            "type": "function_call_output",
+            "call_id": function_call_id,
+            "output": json.dumps(output),
+        },
+    }
+
+
 async def execute_tool_function(
     function_name, function_args, function_call_id, twilio_ws, stream_context
 ):
     """
-    Executes a tool function dynamically based on its name and returns the output.
+    Runs one registered tool under its timeout and returns the formatted
+    output for OpenAI. Failures are reported to the model, never raised.
     Handles both real-time (during call) and post-call tool execution.
     """
-    output = {"status": "error", "message": "Unknown tool execution context."}
-    post_call = (
-        True if stream_context["call_metadata"]["call_status"] == "completed" else False
-    )
-    logger.info(f"Post-call: {post_call}")
-
-    if function_name == "scheduled_appointment":
-        logger.info(f"TOOL CALLED: Scheduling appointment with args {function_args}")
-
-        # Ensure post-call execution is possible
-        if post_call:
-            output = await scheduled_appointment(
-                stream_context["call_metadata"]["issue_id"],
-                stream_context["call_metadata"]["phone_number"],
-                stream_context["call_metadata"]["first_name"],
-                stream_context["call_metadata"]["company"],
-                stream_context["call_metadata"]["issue"],
-                function_args["date"],
-                function_args["time"],
-                stream_context["call_metadata"]["call_id"],
-            )
-            stream_context["appointment_scheduled"] = True
-        else:
-            output = {
-                "status": "failure",
-                "message": "This should only be called in the post-call processing.",
-            }
-        await asyncio.sleep(1)
-    elif function_name == "write_call_summary":
-        logger.info(f"TOOL CALLED: Writing call summary with args {function_args}")
-
-        if post_call:
-            output = await write_call_summary(
-                stream_context["call_metadata"]["call_id"],
-                function_args["summary"],
-            )
-        else:
-            output = {
-                "status": "failure",
-                "message": "This should only be called in the post-call processing.",
-            }
-        await asyncio.sleep(1)  # Simulating delay for call summary
-
-    elif function_name == "end_call":
-        logger.info("TOOL CALLED: Hanging up call")
-
-        # Only execute `end_call` if Twilio is still connected
-        if twilio_ws and twilio_ws.client_state == 1:
-            output = await end_call(twilio_ws, stream_context)
-        else:
-            output = {
-                "status": "failure",
-                "message": "Twilio WebSocket is already closed.",
-            }
-    else:
+    tool = TOOLS.get(function_name)
+    post_call = stream_context["call_metadata"].get("call_status") == "completed"
+    if tool is None:
         logger.warning(f"Unknown tool call: {function_name}")
         output = {"status": "error", "message": f"Unknown tool: {function_name}"}
+    elif tool.post_call_only and not post_call:
+        output = {
+            "status": "failure",
+            "message": "This should only be called in the post-call processing.",
+        }
+    elif tool.needs_twilio and not twilio_connected(twilio_ws):
+        output = {
+            "status": "failure",
+            "message": "Twilio WebSocket is already closed.",
+        }
+    else:
+        logger.info(f"TOOL CALLED: {function_name} with args {function_args}")
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(tool.timeout):
+                output = await tool.handler(function_args, twilio_ws, stream_context)
+        except TimeoutError:
+            TOOL_ERRORS.labels(function_name, "timeout").inc()
+            logger.error(f"Tool {function_name} timed out after {tool.timeout}s")
+            output = {
+                "status": "error",
+                "message": f"{function_name} timed out after {tool.timeout}s.",
+            }
+        except Exception as e:
+            TOOL_ERRORS.labels(function_name, "error").inc()
+            logger.error(f"Error running tool {function_name}: {e}")
+            output = {"status": "error", "message": f"{function_name} failed: {e}"}
+        TOOL_DURATION.labels(function_name).observe(time.perf_counter() - started)
+        if output is None:
+            output = {"status": "error", "message": f"{function_name} failed."}
 
-    # Return the formatted tool response to OpenAI
-    return {
-        "type": "conversation.item.create",
-        "item": {
-            "type": "function_call_output",
-            "call_id": function_call_id,
-            "output": json.dumps(output),
-        },
-    }
+    return build_tool_output(function_call_id, output)
 
 
 async def handle_tool_call(response, twilio_ws, stream_context):
     """
     Orchestrates tool execution when OpenAI requests them.
-    Handles both real-time (during call) and post-call execution.
+    Independent calls from one response run concurrently; calls to the same
+    non-idempotent tool run in the order the model made them. Returns the
+    outputs in that order, followed by a single response.create when a tool
+    wants the model to reply to its output.
     """
     function_calls = extract_tool_calls(response)
-    tool_responses = []
+    if not function_calls:
+        return []
 
-    for function_call in function_calls:
-        function_call_id = function_call.get("call_id")
+    # One chain per non-idempotent tool; every other call runs on its own
+    chains = {}
+    responds = False
+    for index, function_call in enumerate(function_calls):
         function_name = function_call.get("name")
-        function_args = json.loads(function_call.get("arguments", "{}"))
+        tool = TOOLS.get(function_name)
 
         # If `twilio_ws` is required but unavailable, log a warning
-        if function_name == "end_call" and (
-            twilio_ws is None or twilio_ws.client_state != 1
-        ):
+        if tool and tool.needs_twilio and not twilio_connected(twilio_ws):
             logger.warning(
-                "Attempted to call 'end_call' but Twilio WebSocket is unavailable."
+                f"Attempted to call '{function_name}' "
+                "but Twilio WebSocket is unavailable."
             )
             continue  # Skip execution if Twilio is not available
 
-        tool_response = await execute_tool_function(
-            function_name,
-            function_args,
-            function_call_id,
-            twilio_ws,
-            stream_context,
-        )
+        key = function_name if tool and not tool.idempotent else index
+        chains.setdefault(key, []).append((index, function_call))
+        responds = responds or bool(tool and tool.responds)
+
+    outputs = {}
 
-        if tool_response:
-            tool_responses.append(tool_response)
+    async def run_chain(calls):
+        for index, function_call in calls:
+            try:
+                function_args = json.loads(function_call.get("arguments") or "{}")
+            except json.JSONDecodeError as e:
+                outputs[index] = build_tool_output(
+                    function_call.get("call_id"),
+                    {"status": "error", "message": f"Invalid arguments: {e}"},
+                )
+                continue
+            outputs[index] = await execute_tool_function(
+                function_call.get("name"),
+                function_args,
+                function_call.get("call_id"),
+                twilio_ws,
+                stream_context,
+            )
 
+    async with asyncio.TaskGroup() as task_group:
+        for calls in chains.values():
+            task_group.create_task(run_chain(calls))
+
+    tool_responses = [outputs[index] for index in sorted(outputs)]
+    if responds:
+        # One reply to all the outputs, not one per tool
+        tool_responses.append({"type": "response.create"})
     return tool_responses
 
 
-async def post_call_actions(call_id, openai_ws, twilio_data, call_metadata):
+async def answer_tool_calls(openai_router, response, twilio_ws, stream_context):
     """
-    Handles post-call actions such as scheduling an appointment and writing a call summary.
-    Ensures OpenAI WebSocket is open before sending tool requests.
-    Processes tools sequentially to prevent multiple recv() calls.
+    Runs a live response's tool calls and sends all the outputs back in one
+    go. Started as a task, so audio and barge-in keep flowing while tools run.
     """
+    tool_responses = await handle_tool_call(response, twilio_ws, stream_context)
+    try:
+        for tool_response in tool_responses:
+            await openai_router.send(tool_response)
+            logger.debug(f"Tool response sent: {tool_response}")
+    except Exception as e:
+        # end_call, for one, closes the session before its output can be sent
+        logger.debug(f"Tool responses not sent, OpenAI session closed: {e}")
 
-    logger.info(f"Processing post-call actions for call {call_id}...")
 
-    # Ensure OpenAI WebSocket is still open
-    if openai_ws is None or openai_ws.close_code is not None:
-        logger.error("OpenAI WebSocket is closed. Cannot perform post-call actions.")
-        return
+def build_post_call_prompt(
+    call_id, call_metadata, twilio_data, transcript, tools=POST_CALL_TOOLS
+):
+    """
+    Builds the post-call instructions from the stored transcript, the call
+    metadata and Twilio's status callback. `tools` lists the tools still to call.
+    """
     stringified_call_metadata = json.dumps(call_metadata)
     # Extract Twilio data
     called_city = twilio_data.get("CalledCity", "Unknown")
@@ -150,89 +175,84 @@ async def post_call_actions(call_id, openai_ws, twilio_data, call_metadata):
     call_duration = twilio_data.get("CallDuration", "Unknown")
     twilio_call_sid = twilio_data.get("CallSid", "Unknown")
 
-    try:
-        # Ensure OpenAI WebSocket is still open before sending
-
-        scheduled_appointment_request = {
-            "type": "conversation.item.create",
-            "item": {
-                "type": "message",
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_text",
-                        "text": "The call has ended. Please use the tool *scheduled_appointment*. The arguments should be the date and time of the appointment if scheduled.",
-                    }
-                ],
-            },
-        }
-        await openai_ws.send(json.dumps(scheduled_appointment_request))
-        logger.info(f"Sent tool request to OpenAI: {scheduled_appointment_request}")
-
-        # Request OpenAI to use the tool
-        model_response_request = {
-            "type": "response.create",
-            "response": {
-                "modalities": ["text"],
-                "instructions": "Please respond to the message about using tool *scheduled_appointment*.",
-            },
-        }
-        await openai_ws.send(json.dumps(model_response_request))
-        print(f"Requested response: {model_response_request}")
-
-    except Exception as e:
-        logger.error(f"Error during post-call processing: {e}")
-
-    # wait a bit
-    await asyncio.sleep(5)
-
-    try:
-        write_summary_request = {
-            "type": "conversation.item.create",
-            "item": {
-                "type": "message",
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_text",
-                        "text": f"""
-							Please call the function *write_call_summary* with the summary of call {call_id} = {stringified_call_metadata}.
-							Also include the following information:
+    steps = []
+    if "scheduled_appointment" in tools:
+        steps.append(
+            "*scheduled_appointment*, with the date and time of the appointment if one was scheduled (leave them empty otherwise)."
+        )
+    if "write_call_summary" in tools:
+        steps.append(
+            f"""*write_call_summary*, with the summary of call {call_id} = {stringified_call_metadata}.
+							Also include the following information in the summary:
 							- Called City: {called_city}
 							- Called State: {called_state}
 							- Call Status: {call_status}
 							- Call Duration: {call_duration} seconds
-							- Twilio Call SID: {twilio_call_sid}
-						""".strip(),
-                    }
-                ],
-            },
-        }
-        await openai_ws.send(json.dumps(write_summary_request))
-        logger.info(f"Sent tool request to OpenAI: {write_summary_request}")
-        # Request OpenAI to use the tool
-        model_response_request = {
-            "type": "response.create",
-            "response": {
-                "modalities": ["text"],
-                "instructions": "Please respond to the message about using tool *write_call_summary*.",
-            },
-        }
-        await openai_ws.send(json.dumps(model_response_request))
-        logger.info(f"Requested response: {model_response_request}")
-    except Exception as e:
-        logger.error(f"Error during post-call processing: {e}")
+							- Twilio Call SID: {twilio_call_sid}"""
+        )
+    numbered_steps = "\n".join(f"{i}. {step}" for i, step in enumerate(steps, 1))
 
-    logger.info("Post-call actions completed.")
-    # wait a bit
-    await asyncio.sleep(5)
-    if openai_ws:
-        try:
-            if openai_ws.close_code is None:
-                logger.debug("Closing OpenAI WebSocket...")
-                await openai_ws.close()
-                logger.debug("OpenAI WebSocket closed.")
-            else:
-                logger.debug("OpenAI WebSocket was already closed.")
-        except Exception as e:
-            logger.error(f"Error closing OpenAI WebSocket: {e}")
+    return f"""
+							The call below has ended. Please call these tools now, in one response:
+							{numbered_steps}
+
+							Transcript:
+							{transcript or "(no speech was transcribed)"}
+						""".strip()
+
+
+async def request_post_call_tools(
+    openai_router, call_id, call_metadata, prompt, timeout=POST_CALL_TIMEOUT
+):
+    """
+    Asks for the post-call tools in one out-of-band response (it doesn't touch
+    the session's conversation, so one session can serve many calls), waits
+    for that response's `response.done` and runs the tools concurrently.
+    Returns the names of the tools that succeeded.
+    """
+    model_response_request = {
+        "type": "response.create",
+        "response": {
+            "conversation": "none",
+            "input": [
+                {
+                    "type": "message",
+                    "role": "user",
+                    "content": [{"type": "input_text", "text": prompt}],
+                }
+            ],
+            "modalities": ["text"],
+            "tool_choice": "required",
+            "metadata": {"purpose": "post_call", "call_id": call_id},
+        },
+    }
+
+    def is_post_call_response(event):
+        metadata = event.get("response", {}).get("metadata") or {}
+        return metadata.get("call_id") == call_id
+
+    response = await openai_router.request(
+        model_response_request,
+        expect="response.done",
+        timeout=timeout,
+        consume=True,
+        predicate=is_post_call_response,
+    )
+    status = response["response"].get("status")
+    logger.info(f"Post-call response for {call_id}: {status}")
+
+    names = {
+        function_call.get("call_id"): function_call.get("name")
+        for function_call in extract_tool_calls(response)
+    }
+    tool_responses = await handle_tool_call(
+        response, None, {"call_metadata": call_metadata}
+    )
+    succeeded = set()
+    for tool_response in tool_responses:
+        item = tool_response.get("item")
+        if item is None:
+            continue
+        if json.loads(item["output"]).get("status") == "success":
+            succeeded.add(names.get(item["call_id"]))
+    return succeeded
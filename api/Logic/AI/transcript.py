@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import time
+from api.config import logger
+
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_END = "transcript.end"  # Last line of a complete transcript
+
+
+def transcript_path(call_id, directory=TRANSCRIPT_DIR):
+    return os.path.join(directory, f"{call_id}.jsonl")
+
+
+class TranscriptRecorder:
+    """
+    Records a call's conversation from the OpenAI event stream.
+
+    Handlers registered on the event router capture `conversation.item.*`,
+    input audio transcriptions and assistant audio transcripts. Turns are kept
+    in memory in conversation order (user transcriptions complete after the
+    item is created, often after the assistant has started answering) and
+    written once, as JSONL, when the call ends.
+    """
+
+    def __init__(self, call_id, directory=TRANSCRIPT_DIR):
+        self.call_id = call_id
+        self.path = transcript_path(call_id, directory)
+        self.started_at = time.time()
+        self._order = {}  # item_id -> position in the conversation
+        self._turns = {}  # item_id -> turn
+        self._events = []  # function calls and truncations, in arrival order
+
+    def attach(self, openai_router):
+        openai_router.on("conversation.item.created", self._on_item_created)
+        openai_router.on(
+            "conversation.item.input_audio_transcription.completed",
+            self._on_input_transcript,
+        )
+        openai_router.on("response.audio_transcript.done", self._on_output_transcript)
+        openai_router.on("conversation.item.truncated", self._on_truncated)
+        return self
+
+    def _position(self, item_id):
+        return self._order.setdefault(item_id, len(self._order))
+
+    def _on_item_created(self, event):
+        item = event.get("item", {})
+        item_id = item.get("id")
+        if not item_id:
+            return
+        self._position(item_id)
+        if item.get("type") == "message":
+            # Text content (e.g. typed prompts); audio is filled in by transcripts
+            text = " ".join(
+                part.get("text") or part.get("transcript") or ""
+                for part in item.get("content", ())
+            ).strip()
+            self._turns[item_id] = {"role": item.get("role"), "text": text}
+        elif item.get("type") == "function_call":
+            self._events.append(
+                {
+                    "type": "function_call",
+                    "item_id": item_id,
+                    "name": item.get("name"),
+                    "arguments": item.get("arguments"),
+                }
+            )
+
+    def _on_input_transcript(self, event):
+        item_id = event.get("item_id")
+        self._position(item_id)
+        turn = self._turns.setdefault(item_id, {"role": "user", "text": ""})
+        turn["text"] = (event.get("transcript") or "").strip()
+
+    def _on_output_transcript(self, event):
+        item_id = event.get("item_id")
+        self._position(item_id)
+        turn = self._turns.setdefault(item_id, {"role": "assistant", "text": ""})
+        turn["text"] = (event.get("transcript") or "").strip()
+
+    def _on_truncated(self, event):
+        # The caller interrupted; audio after audio_end_ms was never heard
+        self._events.append(
+            {
+                "type": "truncated",
+                "item_id": event.get("item_id"),
+                "audio_end_ms": event.get("audio_end_ms"),
+            }
+        )
+
+    def records(self):
+        """Returns the transcript as a list of records, conversation order first."""
+        turns = sorted(
+            (self._order[item_id], item_id, turn)
+            for item_id, turn in self._turns.items()
+            if turn["text"]
+        )
+        records = [
+            {"type": "turn", "item_id": item_id, **turn} for _, item_id, turn in turns
+        ]
+        records.extend(self._events)
+        records.append(
+            {
+                "type": TRANSCRIPT_END,
+                "call_id": self.call_id,
+                "started_at": self.started_at,
+                "ended_at": time.time(),
+            }
+        )
+        return records
+
+    def _write(self, records):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps(record, ensure_ascii=False) + "\n" for record in records
+            )
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Writes the transcript off the event loop. Returns its path."""
+        records = self.records()
+        try:
+            await asyncio.to_thread(self._write, records)
+            logger.info(f"Transcript saved to {self.path} ({len(records) - 1} records)")
+        except OSError as e:
+            logger.error(f"Error saving transcript for {self.call_id}: {e}")
+        return self.path
+
+
+def load_transcript(path):
+    """
+    Reads a stored transcript. Returns (records, complete), where `complete`
+    is False if the call hasn't finished writing it yet.
+    """
+    if not os.path.exists(path):
+        return [], False
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    complete = bool(records) and records[-1].get("type") == TRANSCRIPT_END
+    return records, complete
+
+
+def format_transcript(records):
+    """Renders transcript records as plain "Role: text" lines for a prompt."""
+    lines = []
+    for record in records:
+        if record.get("type") == "turn":
+            role = "Customer" if record.get("role") == "user" else "Agent"
+            lines.append(f"{role}: {record['text']}")
+        elif record.get("type") == "function_call":
+            lines.append(f"[Agent called {record['name']}({record.get('arguments')})]")
+        elif record.get("type") == "truncated":
+            lines.append("[Customer interrupted the agent]")
+    return "\n".join(lines)
@@ -1,11 +1,28 @@
 from api.config import logger
 import asyncio
+import time
+from collections import deque
 from api.Logic.AI.openai_to_twilio import openai_to_twilio_stream
+from api.Logic.AI.setup import build_local_vad_settings
+from api.Logic.AI.transcript import TranscriptRecorder
+from api.Logic.Recording.recorder import recording_writer
+from api.Utilities.audio_dsp import LineQuality
+from api.Logic.Telephony.inbound_coalescer import create_inbound_coalescer
+from api.Logic.Telephony.local_vad import create_local_vad
 from api.Logic.Telephony.twilio_to_openai import twilio_to_openai_stream
+from api.Utilities.metrics import (
+    CallMetrics,
+    CALLS_ACTIVE,
+    CALLS_TOTAL,
+    CALL_DURATION,
+    INBOUND_FRAMES_SUPPRESSED,
+    LINE_SPEECH_LEVEL,
+)
+from api.Logic.Telephony.twilio_socket import twilio_connected
 
 
 # orchestration
-async def orchestrate_audio_streams(twilio_ws, openai_ws, call_metadata):
+async def orchestrate_audio_streams(twilio_ws, openai_router, call_metadata):
     """Orchestrates real-time audio streaming between Twilio and OpenAI."""
 
     # Initialize shared state and event for synchronization
@@ -13,46 +30,94 @@ async def orchestrate_audio_streams(twilio_ws, openai_ws, call_metadata):
     stream_context = {"stream_sid": None, "stream_ready": stream_ready}
     stream_context["call_metadata"] = call_metadata
 
+    # Per-call timing model used for barge-in truncation
+    stream_context["latest_media_timestamp"] = 0  # Twilio media.timestamp (ms)
+    stream_context["response_start_timestamp_twilio"] = None
+    stream_context["last_assistant_item"] = None
+    stream_context["mark_queue"] = deque()  # Marks sent, not yet played
+    stream_context["openai_router"] = openai_router
+
+    # Latencies go to the /metrics histograms and to this call's summary
+    call_metrics = CallMetrics(call_metadata["call_id"])
+    stream_context["metrics"] = call_metrics
+    CALLS_TOTAL.inc()
+    CALLS_ACTIVE.inc()
+
+    # Post-call processing runs later from this transcript, not the live session
+    transcript = TranscriptRecorder(call_metadata["call_id"]).attach(openai_router)
+    # Stereo call recording, written off the event loop; None when disabled
+    recording = recording_writer.open(call_metadata["call_id"])
+    stream_context["recording"] = recording
+    # Caller line level, silence and clipping, analyzed in 200 ms batches
+    line_quality = LineQuality()
+    stream_context["line_quality"] = line_quality if line_quality.enabled else None
+    # Keeps silent caller audio from OpenAI; None unless enabled for the call
+    local_vad = create_local_vad(build_local_vad_settings(call_metadata))
+    stream_context["local_vad"] = local_vad
+    # Merges caller frames into fewer OpenAI appends; None unless configured
+    stream_context["inbound_coalescer"] = create_inbound_coalescer()
+
+    async def caller_stream():
+        try:
+            await twilio_to_openai_stream(twilio_ws, openai_router.ws, stream_context)
+        finally:
+            # Once the caller is gone the OpenAI session has nothing left to do
+            await openai_router.close()
+
     logger.info("Starting audio streaming...")
     try:
         await asyncio.gather(
-            twilio_to_openai_stream(
-                twilio_ws, openai_ws, stream_context
-            ),  # Twilio → OpenAI
+            caller_stream(),  # Twilio → OpenAI
             openai_to_twilio_stream(
-                twilio_ws, openai_ws, stream_context
+                twilio_ws, openai_router, stream_context
             ),  # OpenAI → Twilio
         )
     except Exception as e:
         logger.error(f"Error in orchestrate_audio_streams: {e}")
     finally:
         logger.debug("Cleaning up audio streams...")
-        await cleanup_audio_streams(twilio_ws, openai_ws)
+        await cleanup_audio_streams(twilio_ws, openai_router)
+        await transcript.save()
+        if recording:
+            recording_writer.close(recording)
+        if local_vad and local_vad.suppressed:
+            call_metrics.count(
+                "inbound_suppressed", INBOUND_FRAMES_SUPPRESSED, local_vad.suppressed
+            )
+        CALLS_ACTIVE.dec()
+        CALL_DURATION.observe(time.perf_counter() - call_metrics.started_at)
+        logger.info(f"Call metrics: {call_metrics.summary()}")
+        quality = line_quality.summary()
+        if quality:
+            if "speech_dbfs" in quality:
+                LINE_SPEECH_LEVEL.observe(quality["speech_dbfs"])
+            logger.info(f"Line quality for {call_metrics.call_id}: {quality}")
         logger.info("Audio streaming cleanup completed.")
 
 
 # Cleanup function
-async def cleanup_audio_streams(twilio_ws, openai_ws):
+async def cleanup_audio_streams(twilio_ws, openai_router):
     """Closes all active WebSocket connections when the call ends."""
 
     logger.info("Initiating cleanup of WebSocket connections...")
 
-    # Close OpenAI WebSocket
-    if openai_ws:
+    # Close OpenAI WebSocket and its event reader
+    if openai_router:
         try:
-            if openai_ws.close_code is None:
+            if openai_router.close_code is None:
                 logger.debug("Closing OpenAI WebSocket...")
-                await openai_ws.close()
+                await openai_router.close()
                 logger.debug("OpenAI WebSocket closed.")
             else:
                 logger.debug("OpenAI WebSocket was already closed.")
+                await openai_router.close()
         except Exception as e:
             logger.error(f"Error closing OpenAI WebSocket: {e}")
 
     # Close Twilio WebSocket
     if twilio_ws:
         try:
-            if twilio_ws.client_state == 1:
+            if twilio_connected(twilio_ws):
                 logger.debug("Closing Twilio WebSocket...")
                 await twilio_ws.close()
                 logger.debug("Twilio WebSocket closed.")
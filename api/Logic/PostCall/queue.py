@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from api.config import logger
+
+POST_CALL_SPOOL = os.getenv("POST_CALL_SPOOL", "post_call_jobs")
+POST_CALL_MAX_ATTEMPTS = int(os.getenv("POST_CALL_MAX_ATTEMPTS", "5"))
+POST_CALL_RETRY_DELAY = 30  # Seconds, doubled on every failed attempt
+POST_CALL_LEASE = 300  # Seconds before a job claimed by a dead worker is retried
+
+PENDING, PROCESSING, DONE, FAILED = "pending", "processing", "done", "failed"
+
+
+class PostCallQueue:
+    """
+    Durable post-call job queue kept as one JSON file per job in a spool
+    directory (pending/, processing/, done/, failed/).
+
+    A job is claimed by renaming it into processing/, which is atomic, so any
+    number of worker processes on the same host (or shared volume) can pull
+    from one spool without a broker. Failed jobs go back to pending/ with an
+    exponential delay until `max_attempts`, then to failed/.
+    """
+
+    def __init__(self, root=POST_CALL_SPOOL, max_attempts=POST_CALL_MAX_ATTEMPTS):
+        self.root = root
+        self.max_attempts = max_attempts
+        self._ready = False
+
+    def _ensure_dirs(self):
+        if not self._ready:
+            for state in (PENDING, PROCESSING, DONE, FAILED):
+                os.makedirs(os.path.join(self.root, state), exist_ok=True)
+            self._ready = True
+
+    def _path(self, state, job_id):
+        return os.path.join(self.root, state, f"{job_id}.json")
+
+    def _write(self, state, job):
+        self._ensure_dirs()
+        path = self._path(state, job["job_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _move(self, job, from_state, to_state):
+        self._write(to_state, job)
+        try:
+            os.remove(self._path(from_state, job["job_id"]))
+        except FileNotFoundError:
+            pass
+
+    def _claim(self, limit):
+        self._ensure_dirs()
+        now = time.time()
+        self._recover_expired(now)
+        pending_dir = os.path.join(self.root, PENDING)
+        claimed = []
+        for name in sorted(os.listdir(pending_dir)):
+            if len(claimed) >= limit:
+                break
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(pending_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if job.get("not_before", 0) > now:
+                continue
+            try:
+                # Atomic: exactly one worker wins the rename
+                os.rename(path, self._path(PROCESSING, job["job_id"]))
+            except FileNotFoundError:
+                continue
+            job["claimed_at"] = now
+            self._write(PROCESSING, job)
+            claimed.append(job)
+        return claimed
+
+    def _recover_expired(self, now):
+        processing_dir = os.path.join(self.root, PROCESSING)
+        for name in os.listdir(processing_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(processing_dir, name)
+            try:
+                if now - os.path.getmtime(path) < POST_CALL_LEASE:
+                    continue
+                os.rename(path, os.path.join(self.root, PENDING, name))
+                logger.warning(f"Post-call job {name} lease expired. Requeued.")
+            except FileNotFoundError:
+                continue
+
+    def _retry(self, job, error, delay):
+        job["attempts"] = job.get("attempts", 0) + 1
+        job["last_error"] = error
+        if job["attempts"] >= self.max_attempts:
+            self._move(job, PROCESSING, FAILED)
+            logger.error(f"Post-call job {job['job_id']} failed: {error}")
+            return
+        if delay is None:
+            delay = POST_CALL_RETRY_DELAY * 2 ** (job["attempts"] - 1)
+        job["not_before"] = time.time() + delay
+        self._move(job, PROCESSING, PENDING)
+
+    def _defer(self, job, delay):
+        job["not_before"] = time.time() + delay
+        self._move(job, PROCESSING, PENDING)
+
+    async def enqueue(self, call_id, call_metadata, twilio_data, transcript_path):
+        job = {
+            "job_id": f"{int(time.time() * 1000):015d}-{uuid.uuid4().hex[:8]}",
+            "call_id": call_id,
+            "call_metadata": call_metadata,
+            "twilio_data": twilio_data,
+            "transcript_path": transcript_path,
+            "created_at": time.time(),
+            "attempts": 0,
+            "not_before": 0,
+            "completed_tools": [],
+        }
+        await asyncio.to_thread(self._write, PENDING, job)
+        logger.info(f"Post-call job queued for call {call_id}")
+        return job
+
+    async def claim(self, limit):
+        """Claims up to `limit` due jobs, oldest first."""
+        return await asyncio.to_thread(self._claim, limit)
+
+    async def complete(self, job):
+        await asyncio.to_thread(self._move, job, PROCESSING, DONE)
+
+    async def retry(self, job, error, delay=None):
+        """Counts a failed attempt and requeues the job with backoff."""
+        await asyncio.to_thread(self._retry, job, error, delay)
+
+    async def defer(self, job, delay):
+        """Requeues the job without counting an attempt (its input isn't ready)."""
+        await asyncio.to_thread(self._defer, job, delay)
+
+
+post_call_queue = PostCallQueue()
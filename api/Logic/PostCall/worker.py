@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from api.config import logger
+from api.Logic.AI.event_router import OpenAIEventRouter
+from api.Logic.AI.setup import connect_to_openai, build_post_call_session_update
+from api.Logic.AI.tool_helpers import (
+    POST_CALL_TOOLS,
+    build_post_call_prompt,
+    request_post_call_tools,
+)
+from api.Logic.AI.transcript import format_transcript, load_transcript
+from api.Logic.PostCall.queue import post_call_queue
+
+POST_CALL_BATCH_SIZE = int(os.getenv("POST_CALL_BATCH_SIZE", "8"))
+POST_CALL_CONCURRENCY = int(os.getenv("POST_CALL_CONCURRENCY", "2"))  # Sessions
+POST_CALL_POLL_INTERVAL = 2.0
+# Run a worker inside the API process; set to 0 when separate workers are deployed
+POST_CALL_INPROCESS_WORKER = os.getenv("POST_CALL_INPROCESS_WORKER", "1") == "1"
+TRANSCRIPT_WAIT = 120  # Seconds to wait for the call's stream to save its transcript
+TRANSCRIPT_RECHECK = 2
+
+
+class PostCallWorker:
+    """
+    Pulls post-call jobs from the queue in batches and runs appointment and
+    summary extraction from the stored transcript.
+
+    Each batch shares one OpenAI session (connected and configured once) and
+    its jobs are sent as out-of-band responses one after another; up to
+    `concurrency` batches run at a time. Tools that already succeeded on an
+    earlier attempt are not requested again, so retries never double-book.
+    """
+
+    def __init__(
+        self,
+        queue=post_call_queue,
+        batch_size=POST_CALL_BATCH_SIZE,
+        concurrency=POST_CALL_CONCURRENCY,
+    ):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self.run()) for _ in range(self.concurrency)
+            ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self):
+        """Processes batches until cancelled."""
+        while True:
+            try:
+                jobs = await self.queue.claim(self.batch_size)
+                if not jobs:
+                    await asyncio.sleep(POST_CALL_POLL_INTERVAL)
+                    continue
+                await self.process_batch(jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Post-call worker error: {e}")
+                await asyncio.sleep(POST_CALL_POLL_INTERVAL)
+
+    async def _connect(self):
+        openai_ws = await connect_to_openai()
+        if openai_ws is None:
+            return None
+        openai_router = OpenAIEventRouter(openai_ws)
+        openai_router.start()
+        try:
+            await openai_router.request(
+                build_post_call_session_update(), expect="session.updated"
+            )
+        except Exception:
+            await openai_router.close()
+            raise
+        return openai_router
+
+    async def process_batch(self, jobs):
+        ready = []
+        for job in jobs:
+            transcript = await self._load_transcript(job)
+            if transcript is not None:
+                ready.append((job, transcript))
+        if not ready:
+            return
+
+        try:
+            openai_router = await self._connect()
+        except Exception as e:
+            openai_router = None
+            logger.error(f"Post-call session setup failed: {e}")
+        if openai_router is None:
+            for job, _ in ready:
+                await self.queue.retry(job, "Could not connect to OpenAI.")
+            return
+
+        try:
+            for job, transcript in ready:
+                await self._process(openai_router, job, transcript)
+        finally:
+            await openai_router.close()
+
+    async def _load_transcript(self, job):
+        """
+        Returns the job's formatted transcript, or None after deferring a job
+        whose call is still writing it.
+        """
+        records, complete = await asyncio.to_thread(
+            load_transcript, job["transcript_path"]
+        )
+        if not complete and time.time() - job["created_at"] < TRANSCRIPT_WAIT:
+            await self.queue.defer(job, TRANSCRIPT_RECHECK)
+            return None
+        if not complete:
+            logger.warning(
+                f"No complete transcript for call {job['call_id']}. "
+                "Processing with what was recorded."
+            )
+        return format_transcript(records)
+
+    async def _process(self, openai_router, job, transcript):
+        call_id = job["call_id"]
+        remaining = [
+            name for name in POST_CALL_TOOLS if name not in job["completed_tools"]
+        ]
+        prompt = build_post_call_prompt(
+            call_id, job["call_metadata"], job["twilio_data"], transcript, remaining
+        )
+        try:
+            succeeded = await request_post_call_tools(
+                openai_router, call_id, job["call_metadata"], prompt
+            )
+        except asyncio.TimeoutError:
+            await self.queue.retry(job, "Post-call response timed out.")
+            return
+        except Exception as e:
+            await self.queue.retry(job, str(e))
+            return
+
+        job["completed_tools"].extend(name for name in remaining if name in succeeded)
+        missing = [
+            name for name in POST_CALL_TOOLS if name not in job["completed_tools"]
+        ]
+        if missing:
+            logger.warning(f"Post-call tools missing for {call_id}: {missing}")
+            await self.queue.retry(job, f"Tools not completed: {missing}")
+            return
+        await self.queue.complete(job)
+        logger.info(f"Post-call processing completed for call {call_id}")
+
+
+post_call_worker = PostCallWorker()
+
+
+async def _main():
+    await asyncio.gather(
+        *(post_call_worker.run() for _ in range(post_call_worker.concurrency))
+    )
+
+
+if __name__ == "__main__":
+    # python -m api.Logic.PostCall.worker
+    logger.info("Starting post-call worker...")
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,265 @@
+import binascii
+import os
+import threading
+import time
+import wave
+from collections import deque
+from api.config import logger
+from api.Utilities.audio_dsp import ULAW_SILENCE, interleave_ulaw_stereo, np
+
+RECORDINGS_ENABLED = os.getenv("RECORDINGS_ENABLED", "1") == "1"
+RECORDING_DIR = os.getenv("RECORDING_DIR", "recordings")
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "wav")  # wav, or flac (soundfile)
+RING_SECONDS = 10  # Audio held per call between writer passes
+WRITE_INTERVAL = 0.5  # Seconds between writer passes
+# Audio is written once it is this old, so late chunks of the other channel
+# still land in the right place
+ALIGN_MS = 1000
+SAMPLE_RATE = 8000
+BYTES_PER_MS = SAMPLE_RATE // 1000  # One ulaw byte per sample
+
+INBOUND, OUTBOUND = 0, 1  # Left channel is the caller, right is the AI
+
+
+class CallRecording:
+    """
+    The event loop's side of a call recording.
+
+    `inbound` and `outbound` copy ulaw bytes into a ring buffer allocated once
+    for the call and note where on the call's timeline they belong; that is
+    all the live audio path pays. The RecordingWriter thread takes the chunks
+    out, lines up the two channels and writes the file. If the writer falls
+    more than RING_SECONDS behind, the oldest chunks are lost, not the call's
+    audio.
+    """
+
+    def __init__(self, call_id, ring_seconds=RING_SECONDS):
+        self.call_id = call_id
+        self.capacity = ring_seconds * SAMPLE_RATE * 2  # Both channels
+        self.ring = bytearray(self.capacity)
+        self.written = 0  # Total bytes ever written; read by the writer thread
+        self.chunks = deque()  # (channel, position_ms, ring offset, length)
+        # Twilio media timestamps count from the start of the stream
+        self.started_at = time.monotonic()
+        self.closed = False
+
+    def _write(self, channel, position_ms, audio):
+        size = len(audio)
+        if size > self.capacity:
+            return
+        start = self.written
+        offset = start % self.capacity
+        first = self.capacity - offset
+        if size <= first:
+            self.ring[offset : offset + size] = audio
+        else:
+            self.ring[offset:] = audio[:first]
+            self.ring[: size - first] = audio[first:]
+        self.written = start + size
+        self.chunks.append((channel, position_ms, start, size))
+
+    def inbound(self, frame, media_timestamp):
+        """Records a caller frame (ulaw bytes) at its Twilio media timestamp (ms)."""
+        if media_timestamp is None:
+            media_timestamp = int((time.monotonic() - self.started_at) * 1000)
+        self._write(INBOUND, media_timestamp, frame)
+
+    def outbound(self, frame, playout_start):
+        """Records AI audio (ulaw bytes) at the time Twilio starts playing it."""
+        position_ms = int((playout_start - self.started_at) * 1000)
+        self._write(OUTBOUND, max(0, position_ms), frame)
+
+    def outbound_delta(self, audio_payload):
+        """Records an unpaced OpenAI delta (base64) as arriving now."""
+        self.outbound(binascii.a2b_base64(audio_payload), time.monotonic())
+
+    def take_chunks(self):
+        """
+        Writer thread: yields (channel, position_ms, audio) for new chunks,
+        skipping any the event loop has already overwritten.
+        """
+        while self.chunks:
+            channel, position_ms, start, size = self.chunks.popleft()
+            offset = start % self.capacity
+            first = min(size, self.capacity - offset)
+            audio = bytes(self.ring[offset : offset + first])
+            if first < size:
+                audio += bytes(self.ring[: size - first])
+            if self.written - start > self.capacity:
+                yield channel, position_ms, None  # Overwritten while copying
+                continue
+            yield channel, position_ms, audio
+
+
+class _RecordingFile:
+    """Writer-side state: the two channels' unwritten audio and the open file."""
+
+    def __init__(self, recording, directory, file_format):
+        self.recording = recording
+        self.base_ms = 0  # Timeline position of the first unwritten byte
+        self.channels = (bytearray(), bytearray())
+        self.end_ms = 0
+        self.lost_chunks = 0
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{recording.call_id}.{file_format}")
+        if file_format == "flac":
+            import soundfile
+
+            self._file = soundfile.SoundFile(
+                self.path,
+                "w",
+                samplerate=SAMPLE_RATE,
+                channels=2,
+                format="FLAC",
+                subtype="PCM_16",
+            )
+        else:
+            self._file = wave.open(self.path, "wb")
+            self._file.setnchannels(2)
+            self._file.setsampwidth(2)
+            self._file.setframerate(SAMPLE_RATE)
+
+    def place(self, channel, position_ms, audio):
+        if audio is None:
+            self.lost_chunks += 1
+            return
+        offset = (position_ms - self.base_ms) * BYTES_PER_MS
+        if offset < 0:
+            # Arrived after that part of the file was written
+            audio = audio[-offset:]
+            offset = 0
+        if not audio:
+            return
+        track = self.channels[channel]
+        end = offset + len(audio)
+        if end > len(track):
+            track.extend(bytes([ULAW_SILENCE]) * (end - len(track)))
+        track[offset:end] = audio
+        self.end_ms = max(self.end_ms, self.base_ms + end // BYTES_PER_MS)
+
+    def flush(self, until_ms):
+        """Writes both channels up to `until_ms` on the call's timeline."""
+        size = (until_ms - self.base_ms) * BYTES_PER_MS
+        if size <= 0:
+            return
+        left, right = self.channels
+        for track in (left, right):
+            if len(track) < size:
+                track.extend(bytes([ULAW_SILENCE]) * (size - len(track)))
+        stereo = interleave_ulaw_stereo(bytes(left[:size]), bytes(right[:size]))
+        del left[:size]
+        del right[:size]
+        self.base_ms = until_ms
+        if isinstance(self._file, wave.Wave_write):
+            # The header is patched once, on close
+            self._file.writeframesraw(stereo)
+        else:
+            self._file.write(np.frombuffer(stereo, dtype="<i2").reshape(-1, 2))
+
+    def close(self):
+        self.flush(self.end_ms)
+        self._file.close()
+        if self.lost_chunks:
+            logger.warning(
+                f"Recording {self.path} lost {self.lost_chunks} chunks; "
+                "the writer fell behind."
+            )
+
+
+class RecordingWriter:
+    """
+    One background thread that drains every call's recording ring and writes
+    stereo 16-bit files in chunks. Nothing here runs on the event loop.
+    """
+
+    def __init__(
+        self,
+        directory=RECORDING_DIR,
+        file_format=RECORDING_FORMAT,
+        interval=WRITE_INTERVAL,
+    ):
+        self.directory = directory
+        self.file_format = file_format
+        self.interval = interval
+        self._recordings = []  # CallRecordings open on the event loop side
+        self._files = {}  # CallRecording -> _RecordingFile, writer thread only
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.file_format == "flac":
+            try:
+                import soundfile  # noqa: F401
+            except ImportError as e:
+                raise RuntimeError(
+                    "FLAC recordings require the 'soundfile' package "
+                    "(pip install soundfile)."
+                ) from e
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="recording-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Writes out everything still buffered and finishes every file."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def open(self, call_id):
+        """Starts recording a call. Returns None while the writer isn't running."""
+        if self._thread is None:
+            return None
+        recording = CallRecording(call_id)
+        with self._lock:
+            self._recordings.append(recording)
+        return recording
+
+    def close(self, recording):
+        """Marks a call's recording finished; the writer completes the file."""
+        recording.closed = True
+
+    def _write_pass(self, final=False):
+        with self._lock:
+            recordings = list(self._recordings)
+        for recording in recordings:
+            closed = recording.closed or final
+            recording_file = self._files.get(recording)
+            try:
+                if recording_file is None:
+                    recording_file = self._files[recording] = _RecordingFile(
+                        recording, self.directory, self.file_format
+                    )
+                for chunk in recording.take_chunks():
+                    recording_file.place(*chunk)
+                if closed:
+                    recording_file.close()
+                    logger.info(f"Recording saved: {recording_file.path}")
+                else:
+                    recording_file.flush(recording_file.end_ms - ALIGN_MS)
+            except Exception as e:
+                logger.error(f"Error writing recording for {recording.call_id}: {e}")
+                if recording_file is not None and not closed:
+                    try:
+                        recording_file.close()
+                    except Exception:
+                        pass
+                closed = True
+            if closed:
+                self._files.pop(recording, None)
+                with self._lock:
+                    self._recordings.remove(recording)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self._write_pass()
+        self._write_pass(final=True)
+
+
+recording_writer = RecordingWriter()
@@ -0,0 +1,421 @@
+import abc
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from api.config import logger
+
+CALL_STORE_URL = os.getenv("CALL_STORE_URL", "memory://")
+CALL_TTL = int(os.getenv("CALL_TTL", str(6 * 60 * 60)))  # Seconds a call is kept
+SWEEP_INTERVAL = 60  # Seconds between eviction sweeps
+MESSAGE_TTL = 300  # Seconds an undelivered worker message is kept
+
+
+class CallStore(abc.ABC):
+    """
+    Call metadata keyed by call_id, plus the Twilio CallSid -> call_id map.
+    Entries expire `ttl` seconds after their last write.
+    Implementations must be safe to share between workers if they claim to be.
+    """
+
+    shared = False  # True if other processes see the same data
+
+    def __init__(self, ttl=CALL_TTL):
+        self.ttl = ttl
+        self._sweeper = None
+
+    @abc.abstractmethod
+    async def get(self, call_id):
+        ...
+
+    @abc.abstractmethod
+    async def put(self, call_id, call_metadata):
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, call_id):
+        ...
+
+    @abc.abstractmethod
+    async def map_sid(self, call_sid, call_id):
+        ...
+
+    @abc.abstractmethod
+    async def call_id_for_sid(self, call_sid):
+        ...
+
+    @abc.abstractmethod
+    async def push_message(self, worker_id, message):
+        """Queues a JSON-serializable message for another worker process."""
+
+    @abc.abstractmethod
+    async def pop_messages(self, worker_id):
+        """Removes and returns the messages queued for a worker, oldest first."""
+
+    async def evict_expired(self):
+        """Removes expired entries. Returns how many calls were evicted."""
+        return 0
+
+    @abc.abstractmethod
+    async def update(self, call_id, **fields):
+        """
+        Merges fields into a stored call. Returns the updated metadata or None.
+        Atomic: concurrent updates from other workers never drop each other's fields.
+        """
+
+    def start(self):
+        """Starts the periodic eviction sweep."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def close(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try:
+                evicted = await self.evict_expired()
+                if evicted:
+                    logger.debug(f"Evicted {evicted} expired calls from call store.")
+            except Exception as e:
+                logger.error(f"Error evicting expired calls: {e}")
+
+
+class InMemoryCallStore(CallStore):
+    """Process-local store. Only valid with a single worker."""
+
+    def __init__(self, ttl=CALL_TTL):
+        super().__init__(ttl)
+        self._calls = {}  # call_id -> (expires_at, metadata)
+        self._sids = {}  # call_sid -> (expires_at, call_id)
+        self._messages = {}  # worker_id -> [message]
+
+    def _live(self, table, key):
+        entry = table.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del table[key]
+            return None
+        return entry[1]
+
+    async def get(self, call_id):
+        call_metadata = self._live(self._calls, call_id)
+        return dict(call_metadata) if call_metadata is not None else None
+
+    async def put(self, call_id, call_metadata):
+        self._calls[call_id] = (time.monotonic() + self.ttl, dict(call_metadata))
+
+    async def delete(self, call_id):
+        self._calls.pop(call_id, None)
+
+    async def map_sid(self, call_sid, call_id):
+        self._sids[call_sid] = (time.monotonic() + self.ttl, call_id)
+
+    async def call_id_for_sid(self, call_sid):
+        return self._live(self._sids, call_sid)
+
+    async def update(self, call_id, **fields):
+        # Nothing awaits in between, so no other task can interleave
+        call_metadata = self._live(self._calls, call_id)
+        if call_metadata is None:
+            return None
+        call_metadata = {**call_metadata, **fields}
+        self._calls[call_id] = (time.monotonic() + self.ttl, call_metadata)
+        return dict(call_metadata)
+
+    async def push_message(self, worker_id, message):
+        self._messages.setdefault(worker_id, []).append(message)
+
+    async def pop_messages(self, worker_id):
+        return self._messages.pop(worker_id, [])
+
+    async def evict_expired(self):
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._calls.items() if expires_at < now]
+        for call_id in expired:
+            del self._calls[call_id]
+        for call_sid in [k for k, (exp, _) in self._sids.items() if exp < now]:
+            del self._sids[call_sid]
+        return len(expired)
+
+
+class SQLiteCallStore(CallStore):
+    """
+    SQLite store in WAL mode, shared by every worker process on the host.
+    Queries run on a dedicated thread so they never block the event loop.
+    """
+
+    shared = True
+
+    def __init__(self, path, ttl=CALL_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calls")
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS calls "
+                "(call_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS call_sids "
+                "(call_sid TEXT PRIMARY KEY, call_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS worker_messages "
+                "(id INTEGER PRIMARY KEY AUTOINCREMENT, worker_id TEXT NOT NULL, "
+                "data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS worker_messages_worker "
+                "ON worker_messages (worker_id, id)"
+            )
+        return self._db
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _get(self, call_id):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT data FROM calls WHERE call_id = ? AND expires_at >= ?",
+                (call_id, time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def _put(self, call_id, data):
+        db = self._connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO calls VALUES (?, ?, ?)",
+                (call_id, data, time.time() + self.ttl),
+            )
+
+    def _update(self, call_id, fields):
+        # One json_set per field in a single UPDATE; JSON values keep nulls,
+        # unlike json_patch, which would delete the key
+        paths = ", ".join("?, json(?)" for _ in fields)
+        params = []
+        for key, value in fields.items():
+            params += [f'$."{key}"', json.dumps(value)]
+        db = self._connect()
+        now = time.time()
+        with db:
+            updated = db.execute(
+                f"UPDATE calls SET data = json_set(data, {paths}), expires_at = ? "
+                "WHERE call_id = ? AND expires_at >= ?",
+                (*params, now + self.ttl, call_id, now),
+            )
+            if not updated.rowcount:
+                return None
+            # Still inside the write transaction, so this is our own write
+            row = db.execute(
+                "SELECT data FROM calls WHERE call_id = ?", (call_id,)
+            ).fetchone()
+        return json.loads(row[0])
+
+    def _delete(self, call_id):
+        db = self._connect()
+        with db:
+            db.execute("DELETE FROM calls WHERE call_id = ?", (call_id,))
+
+    def _map_sid(self, call_sid, call_id):
+        db = self._connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO call_sids VALUES (?, ?, ?)",
+                (call_sid, call_id, time.time() + self.ttl),
+            )
+
+    def _call_id_for_sid(self, call_sid):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT call_id FROM call_sids WHERE call_sid = ? AND expires_at >= ?",
+                (call_sid, time.time()),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def _push_message(self, worker_id, data):
+        db = self._connect()
+        with db:
+            db.execute(
+                "INSERT INTO worker_messages (worker_id, data, expires_at) "
+                "VALUES (?, ?, ?)",
+                (worker_id, data, time.time() + MESSAGE_TTL),
+            )
+
+    def _pop_messages(self, worker_id):
+        db = self._connect()
+        with db:
+            rows = db.execute(
+                "SELECT id, data FROM worker_messages WHERE worker_id = ? ORDER BY id",
+                (worker_id,),
+            ).fetchall()
+            if rows:
+                db.execute(
+                    "DELETE FROM worker_messages WHERE worker_id = ? AND id <= ?",
+                    (worker_id, rows[-1][0]),
+                )
+        return [json.loads(data) for _, data in rows]
+
+    def _evict_expired(self):
+        db = self._connect()
+        now = time.time()
+        with db:
+            evicted = db.execute("DELETE FROM calls WHERE expires_at < ?", (now,))
+            db.execute("DELETE FROM call_sids WHERE expires_at < ?", (now,))
+            # Messages for workers that have gone away
+            db.execute("DELETE FROM worker_messages WHERE expires_at < ?", (now,))
+        return evicted.rowcount
+
+    async def get(self, call_id):
+        return await self._run(self._get, call_id)
+
+    async def put(self, call_id, call_metadata):
+        await self._run(self._put, call_id, json.dumps(call_metadata))
+
+    async def update(self, call_id, **fields):
+        if not fields:
+            return await self.get(call_id)
+        return await self._run(self._update, call_id, fields)
+
+    async def delete(self, call_id):
+        await self._run(self._delete, call_id)
+
+    async def map_sid(self, call_sid, call_id):
+        await self._run(self._map_sid, call_sid, call_id)
+
+    async def call_id_for_sid(self, call_sid):
+        return await self._run(self._call_id_for_sid, call_sid)
+
+    async def push_message(self, worker_id, message):
+        await self._run(self._push_message, worker_id, json.dumps(message))
+
+    async def pop_messages(self, worker_id):
+        return await self._run(self._pop_messages, worker_id)
+
+    async def evict_expired(self):
+        return await self._run(self._evict_expired)
+
+    async def close(self):
+        await super().close()
+        if self._db is not None:
+            await self._run(self._db.close)
+        self._executor.shutdown(wait=False)
+
+
+class RedisCallStore(CallStore):
+    """
+    Store on any Redis-protocol server, shared across hosts.
+    Expiry is delegated to the server with SET ... EX.
+    Requires the optional `redis` package.
+    """
+
+    shared = True
+
+    def __init__(self, url, ttl=CALL_TTL):
+        super().__init__(ttl)
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "RedisCallStore requires the 'redis' package (pip install redis)."
+            ) from e
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def get(self, call_id):
+        data = await self._redis.get(f"call:{call_id}")
+        return json.loads(data) if data else None
+
+    async def put(self, call_id, call_metadata):
+        await self._redis.set(f"call:{call_id}", json.dumps(call_metadata), ex=self.ttl)
+
+    async def update(self, call_id, **fields):
+        from redis.exceptions import WatchError
+
+        key = f"call:{call_id}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # The SET is discarded if another worker writes the call
+                    # after the WATCH; read it again and retry
+                    await pipe.watch(key)
+                    data = await pipe.get(key)
+                    if not data:
+                        return None
+                    call_metadata = {**json.loads(data), **fields}
+                    pipe.multi()
+                    pipe.set(key, json.dumps(call_metadata), ex=self.ttl)
+                    await pipe.execute()
+                    return call_metadata
+                except WatchError:
+                    continue
+
+    async def delete(self, call_id):
+        await self._redis.delete(f"call:{call_id}")
+
+    async def map_sid(self, call_sid, call_id):
+        await self._redis.set(f"call_sid:{call_sid}", call_id, ex=self.ttl)
+
+    async def call_id_for_sid(self, call_sid):
+        return await self._redis.get(f"call_sid:{call_sid}")
+
+    async def push_message(self, worker_id, message):
+        key = f"worker_messages:{worker_id}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, json.dumps(message))
+            pipe.expire(key, MESSAGE_TTL)
+            await pipe.execute()
+
+    async def pop_messages(self, worker_id):
+        key = f"worker_messages:{worker_id}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            messages, _ = await pipe.execute()
+        return [json.loads(data) for data in messages]
+
+    async def close(self):
+        await super().close()
+        await self._redis.aclose()
+
+
+def create_call_store(url=CALL_STORE_URL):
+    """
+    Builds a call store from a URL:
+      memory://                 in-process, single worker only
+      sqlite:///path/calls.db   shared by workers on one host
+      redis://host:6379/0       shared across hosts
+    """
+    if url.startswith("memory://"):
+        return InMemoryCallStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteCallStore(url[len("sqlite:///") :])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCallStore(url)
+    raise ValueError(f"Unsupported CALL_STORE_URL: {url}")
+
+
+call_store = create_call_store()
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+from api.config import logger
+from api.Utilities.loop_watchdog import loop_watchdog, SHED_HOLD_SECONDS
+from api.Utilities.metrics import (
+    ADMISSION_WAITING,
+    CALLS_ADMITTED,
+    CALLS_REJECTED,
+)
+
+MAX_ACTIVE_CALLS = int(os.getenv("MAX_ACTIVE_CALLS", "50"))  # Per process
+# New calls wait this long for a free slot before being refused; 0 never waits
+ADMISSION_WAIT = float(os.getenv("ADMISSION_WAIT", "5"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "20"))
+# Releases a slot whose call never reported a final status (ringing, lost webhook)
+RESERVATION_TTL = 15 * 60
+OPENAI_FAILURE_LIMIT = 3  # Consecutive session failures before OpenAI is "down"
+OPENAI_COOLDOWN = 30  # Seconds new calls are refused after that
+RETRY_AFTER_FULL = 10  # Seconds suggested to clients when every slot is busy
+
+
+class CapacityError(Exception):
+    """A new call was refused. `retry_after` is in seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Call refused: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CallCapacity:
+    """
+    Admission control for this process. A call holds a slot from dialing
+    (or from its media stream, for calls that weren't dialed here) until
+    Twilio reports its final status or the stream ends.
+
+    New calls are refused, with a suggested retry delay, while:
+    - every slot is taken and the short admission queue is full or times out
+    - the event loop is lagging (see loop_watchdog)
+    - OpenAI sessions keep failing to open
+    so calls already in progress keep their audio quality.
+    """
+
+    def __init__(
+        self,
+        max_calls=MAX_ACTIVE_CALLS,
+        wait=ADMISSION_WAIT,
+        queue_size=ADMISSION_QUEUE_SIZE,
+    ):
+        self.max_calls = max_calls
+        self.wait = wait
+        self.queue_size = queue_size
+        self._calls = {}  # call_id -> monotonic time admitted
+        self._waiting = 0
+        self._released = asyncio.Event()
+        self._openai_failures = 0
+        self._openai_down_until = 0.0
+
+    @property
+    def active(self):
+        return len(self._calls)
+
+    def status(self):
+        return {
+            "active": self.active,
+            "max_calls": self.max_calls,
+            "waiting": self._waiting,
+            "refusing": self._refusal(),
+        }
+
+    def _refusal(self):
+        """Returns (reason, retry_after) if new calls should be refused now."""
+        if loop_watchdog.overloaded:
+            return "loop_lag", SHED_HOLD_SECONDS
+        remaining = self._openai_down_until - time.monotonic()
+        if remaining > 0:
+            return "openai", remaining
+        return None
+
+    def _expire(self):
+        cutoff = time.monotonic() - RESERVATION_TTL
+        for call_id, admitted_at in list(self._calls.items()):
+            if admitted_at < cutoff:
+                logger.warning(f"Releasing capacity held by stale call {call_id}.")
+                self.release(call_id)
+
+    def _refuse(self, reason, retry_after):
+        CALLS_REJECTED.labels(reason).inc()
+        raise CapacityError(reason, max(1, int(retry_after + 0.5)))
+
+    async def acquire(self, call_id):
+        """
+        Reserves a slot for a new call, waiting briefly if every slot is taken.
+        Raises CapacityError if the call should not be placed.
+        """
+        refusal = self._refusal()
+        if refusal:
+            self._refuse(*refusal)
+        if call_id in self._calls:
+            return
+
+        if self.active >= self.max_calls:
+            self._expire()
+        if self.active >= self.max_calls:
+            if not self.wait or self._waiting >= self.queue_size:
+                self._refuse("capacity", RETRY_AFTER_FULL)
+            await self._wait_for_slot()
+
+        self._calls[call_id] = time.monotonic()
+        CALLS_ADMITTED.set(self.active)
+
+    async def _wait_for_slot(self):
+        deadline = time.monotonic() + self.wait
+        self._waiting += 1
+        ADMISSION_WAITING.set(self._waiting)
+        try:
+            while self.active >= self.max_calls:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._refuse("capacity", RETRY_AFTER_FULL)
+                self._released.clear()
+                try:
+                    await asyncio.wait_for(self._released.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiting -= 1
+            ADMISSION_WAITING.set(self._waiting)
+
+    def admit_stream(self, call_id):
+        """
+        Claims a slot for a media stream. Calls dialed here already hold one;
+        others are admitted only if there is room right now.
+        Returns False if the stream should be turned away.
+        """
+        if call_id in self._calls:
+            return True
+        if self._refusal() is not None or self.active >= self.max_calls:
+            CALLS_REJECTED.labels("stream").inc()
+            return False
+        self._calls[call_id] = time.monotonic()
+        CALLS_ADMITTED.set(self.active)
+        return True
+
+    def release(self, call_id):
+        """Frees the call's slot. Safe to call more than once."""
+        if self._calls.pop(call_id, None) is not None:
+            CALLS_ADMITTED.set(self.active)
+            self._released.set()
+
+    def record_openai(self, ok):
+        """Tracks whether OpenAI sessions are opening, to stop dialing if not."""
+        if ok:
+            self._openai_failures = 0
+            return
+        self._openai_failures += 1
+        if self._openai_failures >= OPENAI_FAILURE_LIMIT:
+            if time.monotonic() >= self._openai_down_until:
+                logger.warning(
+                    f"{self._openai_failures} OpenAI sessions failed in a row. "
+                    f"Refusing new calls for {OPENAI_COOLDOWN}s."
+                )
+            self._openai_down_until = time.monotonic() + OPENAI_COOLDOWN
+
+
+call_capacity = CallCapacity()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import socket
+from api.config import logger
+from api.Logic.State.call_store import call_store
+
+# Identifies this process among the uvicorn workers (and hosts) sharing a store
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))  # Also read by uvicorn
+INBOX_POLL_INTERVAL = 0.25  # Seconds
+
+
+class WorkerInbox:
+    """
+    Delivers messages to the worker process that owns some live state.
+
+    Live OpenAI sessions, prepared sessions, capacity slots and campaigns
+    can't be shared between processes, and uvicorn workers share one
+    listening socket, so a webhook for a call can land on any worker.
+    Handlers for such state are registered here by message kind; `send`
+    runs the handler directly when this worker is the owner, and otherwise
+    queues the message in the shared call store for the owner to poll.
+    """
+
+    def __init__(self, store=call_store, poll_interval=INBOX_POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._task = None
+
+    def register(self, kind, handler):
+        """`handler` is an async function taking the message's fields."""
+        self._handlers[kind] = handler
+
+    async def send(self, worker_id, kind, **fields):
+        if worker_id in (None, WORKER_ID):
+            await self._dispatch({"kind": kind, **fields})
+        else:
+            await self.store.push_message(worker_id, {"kind": kind, **fields})
+
+    def start(self):
+        """Starts polling for messages; only needed when workers share a store."""
+        if self._task is None and self.store.shared:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _dispatch(self, message):
+        handler = self._handlers.get(message.pop("kind", None))
+        if handler is None:
+            logger.warning(f"No handler for worker message: {message}")
+            return
+        try:
+            await handler(**message)
+        except Exception as e:
+            logger.error(f"Error handling worker message {message}: {e}")
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                messages = await self.store.pop_messages(WORKER_ID)
+            except Exception as e:
+                logger.error(f"Error reading worker messages: {e}")
+                continue
+            for message in messages:
+                await self._dispatch(message)
+
+
+worker_inbox = WorkerInbox()
@@ -0,0 +1,273 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from api.config import logger
+from api.Logic.State.call_store import call_store
+from api.Logic.State.capacity import CapacityError
+from api.Logic.State.worker_inbox import WORKER_ID
+from api.Logic.Telephony.outbound import place_call
+from api.Utilities.date_conversions import parse_time
+
+MAX_CALL_SECONDS = 60 * 60  # Frees a concurrency slot if no status callback arrives
+IDLE_POLL_SECONDS = 30  # Upper bound on sleeps while waiting for work
+FINISHED_CAMPAIGN_TTL = 60 * 60  # Status stays readable this long after the end
+
+
+def seconds_until_open(window, now=None):
+    """
+    Returns 0 if `window` (a CallingWindow) is open now, otherwise the number of
+    seconds until it next opens.
+    """
+    if window is None:
+        return 0
+    zone = ZoneInfo(window.timezone)
+    local_now = (now or datetime.now(tz=zone)).astimezone(zone)
+    start, end = parse_time(window.start), parse_time(window.end)
+    if end <= start:
+        end += 24 * 60  # Overnight: closes the next morning
+
+    # From yesterday, whose overnight window may still be open
+    for day_offset in range(-1, 8):
+        day = (local_now + timedelta(days=day_offset)).date()
+        if day.weekday() not in window.weekdays:
+            continue
+        midnight = datetime(day.year, day.month, day.day, tzinfo=zone)
+        opens = midnight + timedelta(minutes=start)
+        closes = midnight + timedelta(minutes=end)
+        if local_now < closes:
+            return max(0.0, (opens - local_now).total_seconds())
+    return float(IDLE_POLL_SECONDS)
+
+
+class _Attempt:
+    def __init__(self, call_request):
+        self.call_request = call_request
+        self.attempts = 0
+        self.not_before = 0.0
+
+
+class Campaign:
+    """One bulk dial job: a time-ordered queue of attempts and its counters."""
+
+    def __init__(self, campaign_request):
+        self.campaign_id = str(uuid.uuid4())
+        self.settings = campaign_request
+        self.state = "running"
+        self.total = len(campaign_request.calls)
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.in_progress = {}  # call_id -> _Attempt
+        self.slots = asyncio.Semaphore(campaign_request.max_concurrency)
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+        self._seq = itertools.count()
+        self._queue = []  # heap of (not_before, seq, _Attempt)
+        for call_request in campaign_request.calls:
+            self.push(_Attempt(call_request))
+
+    def push(self, attempt):
+        heapq.heappush(self._queue, (attempt.not_before, next(self._seq), attempt))
+        self.wakeup.set()
+
+    def status(self):
+        return {
+            "campaign_id": self.campaign_id,
+            "state": self.state,
+            "total": self.total,
+            "queued": len(self._queue),
+            "in_progress": len(self.in_progress),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+
+class CampaignDialer:
+    """
+    Dials campaigns in the background with per-campaign concurrency, a calls per
+    second limit, per-company calling windows and retries on busy/no-answer.
+    A concurrency slot is held from dialing until Twilio's status callback.
+    Campaigns run in the worker that accepted them; with a shared call store
+    their status is published there for the other workers to read.
+    """
+
+    def __init__(self):
+        self.campaigns = {}
+        self._calls = {}  # call_id -> Campaign
+        self._publishing = set()
+
+    def publish(self, campaign):
+        """Saves the campaign's status to a shared call store, in the background."""
+        if not call_store.shared:
+            return
+        status = {**campaign.status(), "worker_id": WORKER_ID}
+        task = asyncio.create_task(
+            call_store.put(f"campaign:{campaign.campaign_id}", status)
+        )
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    def submit(self, campaign_request):
+        campaign = Campaign(campaign_request)
+        self.campaigns[campaign.campaign_id] = campaign
+        campaign.task = asyncio.create_task(self._run(campaign))
+        campaign.task.add_done_callback(lambda _: self._forget_later(campaign))
+        self.publish(campaign)
+        logger.info(
+            f"Campaign {campaign.campaign_id} started with {campaign.total} calls."
+        )
+        return campaign
+
+    def cancel(self, campaign_id):
+        campaign = self.campaigns.get(campaign_id)
+        if campaign and campaign.task and not campaign.task.done():
+            campaign.state = "cancelled"
+            campaign.task.cancel()
+        return campaign
+
+    def _forget_later(self, campaign):
+        """Drops an ended campaign from memory once its TTL has passed."""
+        asyncio.get_running_loop().call_later(
+            FINISHED_CAMPAIGN_TTL, self.campaigns.pop, campaign.campaign_id, None
+        )
+
+    async def stop(self):
+        for campaign_id in list(self.campaigns):
+            self.cancel(campaign_id)
+
+    def on_call_status(self, call_id, call_status):
+        """
+        Called from the Twilio status callback with the call's final status.
+        Frees the concurrency slot and requeues retryable outcomes.
+        """
+        campaign = self._calls.pop(call_id, None)
+        if campaign is None:
+            return
+        attempt = campaign.in_progress.pop(call_id, None)
+        if attempt is None:
+            return
+        campaign.slots.release()
+
+        settings = campaign.settings
+        if call_status == "completed":
+            campaign.completed += 1
+        elif (
+            call_status in settings.retry_statuses
+            and attempt.attempts < settings.max_attempts
+        ):
+            campaign.retries += 1
+            attempt.not_before = time.monotonic() + settings.retry_delay_seconds
+            campaign.push(attempt)
+        else:
+            campaign.failed += 1
+        campaign.wakeup.set()
+        self.publish(campaign)
+
+    def _expire(self, campaign, call_id):
+        # No status callback arrived in time; treat the call as failed
+        if call_id in campaign.in_progress:
+            logger.warning(f"No final status for call {call_id}. Releasing slot.")
+            self.on_call_status(call_id, "failed")
+
+    async def _next_attempt(self, campaign):
+        """Waits for the next attempt that is due and inside its calling window."""
+        while True:
+            if not campaign._queue:
+                if not campaign.in_progress:
+                    return None
+                campaign.wakeup.clear()
+                await campaign.wakeup.wait()
+                continue
+
+            not_before, _, attempt = campaign._queue[0]
+            delay = not_before - time.monotonic()
+            if delay > 0:
+                campaign.wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        campaign.wakeup.wait(), min(delay, IDLE_POLL_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(campaign._queue)
+            window = campaign.settings.calling_windows.get(
+                attempt.call_request.company
+            )
+            wait = seconds_until_open(window)
+            if wait > 0:
+                # Outside the company's calling window: try again when it opens
+                attempt.not_before = time.monotonic() + wait
+                campaign.push(attempt)
+                continue
+            return attempt
+
+    async def _run(self, campaign):
+        settings = campaign.settings
+        interval = 1.0 / settings.calls_per_second if settings.calls_per_second else 0
+        next_dial_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                await campaign.slots.acquire()
+                attempt = await self._next_attempt(campaign)
+                if attempt is None:
+                    campaign.slots.release()
+                    break
+
+                # Calls per second limit
+                delay = next_dial_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_dial_at = max(next_dial_at, time.monotonic()) + interval
+
+                attempt.attempts += 1
+                try:
+                    call_metadata = await place_call(attempt.call_request, prepare=False)
+                except CapacityError as e:
+                    # Not a failed attempt: dial it again once there's room
+                    attempt.attempts -= 1
+                    attempt.not_before = time.monotonic() + e.retry_after
+                    campaign.push(attempt)
+                    campaign.slots.release()
+                    continue
+                except Exception as e:
+                    logger.error(f"Campaign {campaign.campaign_id} dial failed: {e}")
+                    campaign.slots.release()
+                    if attempt.attempts < settings.max_attempts:
+                        campaign.retries += 1
+                        attempt.not_before = (
+                            time.monotonic() + settings.retry_delay_seconds
+                        )
+                        campaign.push(attempt)
+                    else:
+                        campaign.failed += 1
+                    continue
+
+                call_id = call_metadata["call_id"]
+                campaign.in_progress[call_id] = attempt
+                self._calls[call_id] = campaign
+                loop.call_later(MAX_CALL_SECONDS, self._expire, campaign, call_id)
+                self.publish(campaign)
+
+            campaign.state = "finished"
+            logger.info(f"Campaign {campaign.campaign_id} finished: {campaign.status()}")
+        except asyncio.CancelledError:
+            campaign.state = "cancelled"
+            raise
+        except Exception as e:
+            campaign.state = "error"
+            logger.error(f"Campaign {campaign.campaign_id} stopped: {e}")
+        finally:
+            self.publish(campaign)
+
+
+campaign_dialer = CampaignDialer()
@@ -0,0 +1,81 @@
+import binascii
+import os
+import time
+from api.Utilities.audio_dsp import ULAW_TO_PCM16
+from api.Utilities.loop_watchdog import loop_watchdog
+
+# Caller audio merged into each input_audio_buffer.append; 0 sends every
+# 20 ms frame on its own. 40-100 ms trades that much delay for 2-5x fewer sends.
+INBOUND_COALESCE_MS = int(os.getenv("INBOUND_COALESCE_MS", "0"))
+MAX_COALESCE_MS = 200
+FRAME_MS = 20
+# A frame with this many samples louder than ONSET_LEVEL (about -40 dBFS)
+# counts as sound, so speech onset is found without decoding the frame
+ONSET_LEVEL = 330
+ONSET_SAMPLES = 16
+_QUIET_CODES = bytes(
+    code for code in range(256) if abs(ULAW_TO_PCM16[code]) < ONSET_LEVEL
+)
+
+
+class InboundCoalescer:
+    """
+    Merges consecutive caller frames into one OpenAI append, so a call
+    makes a send every `window_ms` instead of every 20 ms.
+
+    The delay added is bounded by the window in wall-clock time, not only
+    in audio: frames that arrive late or bunched are flushed as soon as the
+    oldest has waited `window_ms`. Buffered audio is also sent at once when
+    - a frame has sound in it after a quiet one (speech onset),
+      so the server VAD hears the caller start without waiting a window
+    - the event loop is lagging by more than the window, since every
+      send is already late and holding audio would only add to it
+    """
+
+    def __init__(self, window_ms):
+        self.window_frames = max(1, window_ms // FRAME_MS)
+        self.window = window_ms / 1000
+        self._frames = []
+        self._first_at = 0.0
+        self._speaking = False
+
+    def add(self, frame):
+        """
+        Buffers one frame of ulaw bytes. Returns the base64 payload for an
+        append when the buffer should go out now, otherwise None.
+        """
+        now = time.monotonic()
+        if not self._frames:
+            self._first_at = now
+        self._frames.append(frame)
+
+        # Quiet samples are deleted; whatever is left is loud
+        speaking = len(frame.translate(None, _QUIET_CODES)) >= ONSET_SAMPLES
+        onset = speaking and not self._speaking
+        self._speaking = speaking
+
+        if (
+            onset
+            or len(self._frames) >= self.window_frames
+            or now - self._first_at >= self.window
+            or loop_watchdog.last_lag > self.window
+        ):
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Returns whatever is buffered as one base64 payload, or None."""
+        if not self._frames:
+            return None
+        audio = (
+            self._frames[0] if len(self._frames) == 1 else b"".join(self._frames)
+        )
+        self._frames.clear()
+        return binascii.b2a_base64(audio, newline=False).decode("ascii")
+
+
+def create_inbound_coalescer(window_ms=INBOUND_COALESCE_MS):
+    """Returns an InboundCoalescer, or None when coalescing is off."""
+    if window_ms <= FRAME_MS:
+        return None
+    return InboundCoalescer(min(window_ms, MAX_COALESCE_MS))
@@ -0,0 +1,89 @@
+from collections import deque
+from api.Utilities.audio_dsp import FRAME_BYTES, frame_levels, np
+
+FRAME_MS = 20
+NOISE_MARGIN_DB = 10  # Speech must be this far above the line's noise floor
+NOISE_FLOOR_ALPHA = 0.05  # Smoothing of the noise floor estimate
+ONSET_FRAMES = 3  # Consecutive loud frames before speech is declared
+
+
+class LocalVad:
+    """
+    Energy-based voice activity filter between Twilio and OpenAI.
+
+    Every frame is forwarded while the caller speaks and for `hangover_ms`
+    after, which must outlast the server VAD's silence_duration_ms so it
+    can still end the turn. Past that, silence is either thinned to one
+    frame every `keepalive_ms` ("thin") or held back entirely
+    ("suppress"). Held frames are kept for `prefix_padding_ms` and sent
+    ahead of the first frames of speech, so OpenAI still gets the lead-in.
+
+    With `barge_in`, speech sustained for `barge_in_ms` is reported so the
+    AI can be interrupted before the server's speech_started arrives.
+    """
+
+    def __init__(self, settings):
+        self.mode = settings["mode"]
+        self.threshold_dbfs = settings["threshold_dbfs"]
+        self.hangover_frames = settings["hangover_ms"] // FRAME_MS
+        self.keepalive_frames = max(1, settings["keepalive_ms"] // FRAME_MS)
+        self.barge_in_frames = (
+            settings["barge_in_ms"] // FRAME_MS if settings["barge_in"] else 0
+        )
+        self._lead_in = deque(maxlen=max(1, settings["prefix_padding_ms"] // FRAME_MS))
+        self.noise_floor_dbfs = self.threshold_dbfs - NOISE_MARGIN_DB
+        self.in_speech = False
+        self._speech_run = 0
+        self._silent_frames = 0
+        self._held_frames = 0
+        self.suppressed = 0  # Frames not forwarded
+
+    def process(self, audio_payload, frame):
+        """
+        Takes one frame (base64 payload and its ulaw bytes).
+        Returns (payloads to forward now, oldest first; True to interrupt).
+        """
+        level = frame_levels(frame, len(frame) or FRAME_BYTES)[0]
+        level = float(level[0]) if len(level) else -90.0
+        threshold = max(self.threshold_dbfs, self.noise_floor_dbfs + NOISE_MARGIN_DB)
+
+        interrupt = False
+        if level > threshold:
+            self._speech_run += 1
+            # A click or two doesn't count as speech
+            if self._speech_run >= ONSET_FRAMES:
+                self.in_speech = True
+                self._silent_frames = 0
+            interrupt = self._speech_run == self.barge_in_frames
+        else:
+            self._speech_run = 0
+            self._silent_frames += 1
+            self.noise_floor_dbfs += NOISE_FLOOR_ALPHA * (
+                level - self.noise_floor_dbfs
+            )
+            if self._silent_frames > self.hangover_frames:
+                self.in_speech = False
+
+        if self.in_speech or self._silent_frames <= self.hangover_frames:
+            if self._lead_in:
+                payloads = (*self._lead_in, audio_payload)
+                self._lead_in.clear()
+                return payloads, interrupt
+            return (audio_payload,), interrupt
+
+        # Silence past the hangover (or loud frames not yet counted as speech)
+        if len(self._lead_in) == self._lead_in.maxlen:
+            self.suppressed += 1
+        self._lead_in.append(audio_payload)
+        self._held_frames += 1
+        if self.mode == "thin" and self._held_frames % self.keepalive_frames == 0:
+            # The oldest held frame, so OpenAI still gets audio in order
+            return (self._lead_in.popleft(),), interrupt
+        return (), interrupt
+
+
+def create_local_vad(settings):
+    """Returns a LocalVad for the call's settings, or None when it is off."""
+    if not settings or settings["mode"] == "off" or np is None:
+        return None
+    return LocalVad(settings)
@@ -0,0 +1,98 @@
+"""
+Fast-path codec for Twilio media frames.
+
+Twilio sends a JSON text frame every 20 ms that looks like:
+
+    {"event":"media","sequenceNumber":"3","media":{"track":"inbound",
+     "chunk":"1","timestamp":"5","payload":"<base64 ulaw>"},"streamSid":"MZ..."}
+
+Rather than json.loads + json.dumps on every frame, these helpers locate the
+payload span with plain string searches and build the OpenAI message from a
+prebuilt template. Anything unusual falls back to json.loads in the caller.
+"""
+
+import json
+
+MEDIA_EVENT_MARKER = '"event":"media"'
+PAYLOAD_KEY = '"payload":"'
+TIMESTAMP_KEY = '"timestamp":"'
+
+# OpenAI message template, split around the base64 audio
+AUDIO_APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+AUDIO_APPEND_SUFFIX = '"}'
+
+
+def extract_media_payload(message):
+    """
+    Returns the base64 payload of a raw Twilio media frame, or None if the
+    frame is not a media frame or the payload cannot be located.
+    Base64 never contains quotes, so the payload ends at the next quote.
+    """
+    if MEDIA_EVENT_MARKER not in message:
+        return None
+    start = message.find(PAYLOAD_KEY)
+    if start == -1:
+        return None
+    start += len(PAYLOAD_KEY)
+    end = message.find('"', start)
+    if end == -1:
+        return None
+    return message[start:end]
+
+
+def extract_media_timestamp(message):
+    """
+    Returns the `media.timestamp` of a raw Twilio media frame as an int (ms since
+    the stream started), or None if it cannot be located.
+    """
+    start = message.find(TIMESTAMP_KEY)
+    if start == -1:
+        return None
+    start += len(TIMESTAMP_KEY)
+    end = message.find('"', start)
+    if end == -1:
+        return None
+    try:
+        return int(message[start:end])
+    except ValueError:
+        return None
+
+
+def build_twilio_mark(stream_sid, mark_name):
+    """
+    Builds a Twilio `mark` message. Twilio echoes it back once all audio sent
+    before it has been played to the caller.
+    """
+    return json.dumps(
+        {"event": "mark", "streamSid": stream_sid, "mark": {"name": mark_name}}
+    )
+
+
+def build_audio_append(audio_payload):
+    """
+    Builds the OpenAI `input_audio_buffer.append` message for a base64 payload.
+    The payload is inserted as-is, so the result is valid JSON without json.dumps.
+    """
+    return AUDIO_APPEND_PREFIX + audio_payload + AUDIO_APPEND_SUFFIX
+
+
+def build_twilio_media_prefix(stream_sid):
+    """
+    Preformats the Twilio `media` envelope for a stream, up to the payload.
+    Built once per call so each outbound delta is a single concatenation.
+    """
+    return (
+        '{"event":"media","streamSid":'
+        + json.dumps(stream_sid)
+        + ',"media":{"payload":"'
+    )
+
+
+TWILIO_MEDIA_SUFFIX = '"}}'
+
+
+def build_twilio_media(media_prefix, audio_payload):
+    """
+    Wraps an already base64-encoded ulaw payload in the Twilio `media` envelope.
+    """
+    return media_prefix + audio_payload + TWILIO_MEDIA_SUFFIX
@@ -0,0 +1,58 @@
+import uuid
+from api.config import DOMAIN, TWILIO_PHONE_NUMBER
+from api.config import logger
+from api.Logic.AI.connection_pool import prepare_session
+from api.Logic.State.call_store import call_store
+from api.Logic.State.capacity import call_capacity
+from api.Logic.State.worker_inbox import WORKER_ID
+from api.Logic.Telephony.twilio_client import twilio_rest
+
+
+def _create_call(twilio_client, call_id, phone_number):
+    return twilio_client.calls.create(
+        to=phone_number,
+        from_=TWILIO_PHONE_NUMBER,
+        url=f"https://{DOMAIN}/twilio/call-initiate/{call_id}",
+        status_callback=f"https://{DOMAIN}/twilio/call-completed",
+        status_callback_event=["completed"],
+        status_callback_method="POST",
+    )
+
+
+async def place_call(call_request, prepare=True):
+    """
+    Dials a customer through Twilio and stores the call metadata.
+    With `prepare`, an OpenAI session is claimed while the phone rings;
+    bulk dialers skip this and claim it when the call is answered.
+    Raises CapacityError if this process can't take another call right now.
+    Returns the stored call metadata.
+    """
+    call_id = str(uuid.uuid4())
+
+    await call_capacity.acquire(call_id)
+    try:
+        call = await twilio_rest.run(_create_call, call_id, call_request.phone_number)
+    except Exception:
+        call_capacity.release(call_id)
+        raise
+    logger.info(f"Call initiated successfully: {call_id}")
+
+    call_metadata = {
+        "call_id": call_id,
+        "twilio_call_sid": call.sid,
+        "call_status": call.status,
+        **call_request.model_dump(),
+        # Worker holding the capacity slot (and campaign) for this call
+        "worker_id": WORKER_ID,
+    }
+    if prepare:
+        call_metadata["session_worker"] = WORKER_ID
+    await call_store.put(call_id, call_metadata)
+    await call_store.map_sid(call.sid, call_id)
+    logger.info(f"Call metadata stored: {call_metadata}")
+
+    if prepare:
+        # Get the OpenAI session ready while the phone is ringing
+        prepare_session(call_id, call_metadata)
+
+    return call_metadata
@@ -0,0 +1,300 @@
+import asyncio
+import binascii
+import time
+from collections import deque
+from api.config import logger
+from api.Logic.Telephony.twilio_socket import twilio_connected
+from api.Utilities.metrics import OUTBOUND_AUDIO_DROPPED
+from api.Logic.Telephony.media_codec import (
+    build_twilio_media_prefix,
+    build_twilio_media,
+    build_twilio_mark,
+)
+
+FRAME_MS = 20
+FRAME_BYTES = 160  # 8 kHz g711_ulaw, one byte per sample
+BYTES_PER_MS = FRAME_BYTES // FRAME_MS
+MAX_BUFFER_MS = 30000  # Jitter buffer bound per call; oldest audio dropped past it
+LEAD_FRAMES = 3  # Frames sent ahead of real time to cover network jitter
+MAX_LATE_MS = 500  # Audio this far behind schedule is skipped, not played late
+SEND_TIMEOUT = 2.0  # Seconds; a send slower than this stalls outbound audio
+STALL_LIMIT = 10.0  # Seconds a stalled send may take before the call is ended
+PACE_OUTBOUND_AUDIO = True
+
+
+class OutboundAudioPacer:
+    """
+    Re-chunks OpenAI audio deltas into fixed 20 ms ulaw frames and sends them
+    to Twilio on a monotonic clock, so Twilio's playout buffer never holds more
+    than a few frames. Keeps a playout clock per assistant item so barge-in can
+    truncate at the exact number of milliseconds the caller actually heard.
+
+    Memory per call is bounded whatever the Twilio socket does:
+    - the buffer holds at most `max_buffer_ms`; the oldest audio goes first
+    - if sends fall more than MAX_LATE_MS behind, that audio is skipped so
+      the caller stays in real time
+    - a send that takes longer than SEND_TIMEOUT stalls the pacer: the
+      buffer is discarded and audio is dropped on arrival until the send
+      completes, then pacing resumes. If it hasn't completed after a
+      further STALL_LIMIT the socket is taken to be gone and is closed,
+      which ends the call rather than leaving it up without AI audio.
+    """
+
+    def __init__(
+        self,
+        twilio_ws,
+        stream_sid,
+        max_buffer_ms=MAX_BUFFER_MS,
+        lead_frames=LEAD_FRAMES,
+        on_frame=None,
+    ):
+        self.twilio_ws = twilio_ws
+        self.stream_sid = stream_sid
+        self.media_prefix = build_twilio_media_prefix(stream_sid)
+        self.max_buffer_bytes = max_buffer_ms * BYTES_PER_MS
+        self.lead_frames = lead_frames
+        # Called with (frame, playout start) for every frame sent, e.g. recording
+        self.on_frame = on_frame
+
+        # Pending audio as [item_id, bytearray] segments, oldest first.
+        # Twilio marks are queued in line as [None, mark_name].
+        self._segments = deque()
+        self._buffered_bytes = 0
+        self._data_ready = asyncio.Event()
+        self._task = None
+
+        # Playout clock: when Twilio will have played everything sent so far
+        self._playout_end = 0.0
+        # item_id -> [playout start (monotonic), ms sent so far]
+        self._items = {}
+        self.dropped_ms = 0
+        self.stalled = False
+
+    def start(self):
+        """Starts the pacing task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stops the pacing task and discards anything still buffered."""
+        self.flush()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def push(self, item_id, audio_payload):
+        """
+        Queues a base64 ulaw delta for playout.
+        Deltas are not aligned to frame boundaries, so they are decoded once here
+        and re-encoded per frame when sent.
+        """
+        audio = binascii.a2b_base64(audio_payload)
+        if self.stalled:
+            self._count_dropped(len(audio), "stalled")
+            return
+        last = self._segments[-1] if self._segments else None
+        if last and last[0] == item_id and isinstance(last[1], bytearray):
+            last[1].extend(audio)
+        else:
+            self._segments.append([item_id, bytearray(audio)])
+        self._buffered_bytes += len(audio)
+
+        if self._buffered_bytes > self.max_buffer_bytes:
+            self._drop_oldest(self._buffered_bytes - self.max_buffer_bytes)
+        self._data_ready.set()
+
+    def mark(self, mark_name):
+        """Queues a Twilio mark to be sent right after the audio pushed so far."""
+        self._segments.append([None, mark_name])
+        self._data_ready.set()
+
+    def flush(self):
+        """
+        Discards all buffered audio immediately (barge-in).
+        The caller is responsible for sending Twilio a `clear` event.
+        """
+        self._segments.clear()
+        self._buffered_bytes = 0
+        now = time.monotonic()
+        # Twilio is told to clear its buffer, so nothing sent is still pending
+        for item in self._items.values():
+            item[1] = min(item[1], self._elapsed_ms(item[0], now))
+        self._playout_end = now
+
+    def played_ms(self, item_id):
+        """
+        Returns how many milliseconds of an item the caller has actually heard.
+        """
+        item = self._items.get(item_id)
+        if item is None:
+            return 0
+        started_at, sent_ms = item
+        return int(min(sent_ms, self._elapsed_ms(started_at, time.monotonic())))
+
+    @staticmethod
+    def _elapsed_ms(started_at, now):
+        return max(0, int((now - started_at) * 1000))
+
+    def _count_dropped(self, size, reason):
+        dropped_ms = size // BYTES_PER_MS
+        self.dropped_ms += dropped_ms
+        OUTBOUND_AUDIO_DROPPED.labels(reason).inc(dropped_ms / 1000)
+
+    def _drop_oldest(self, excess_bytes):
+        # Marks are kept so every mark sent to Twilio still gets echoed back
+        kept = deque()
+        while self._segments:
+            segment = self._segments.popleft()
+            audio = segment[1]
+            if excess_bytes > 0 and isinstance(audio, bytearray):
+                dropped = min(excess_bytes, len(audio))
+                del audio[:dropped]
+                self._buffered_bytes -= dropped
+                self._count_dropped(dropped, "buffer_full")
+                excess_bytes -= dropped
+                if not audio:
+                    continue
+            kept.append(segment)
+        self._segments = kept
+        logger.warning(
+            f"Outbound jitter buffer full. Dropped audio, total {self.dropped_ms}ms."
+        )
+
+    def _skip_late(self, late_bytes):
+        """
+        Drops audio from the head of the buffer that could only be played late.
+        The item's clock moves forward by the same amount, so barge-in still
+        truncates at the right position.
+        """
+        item_id, audio = self._segments[0]
+        skipped = min(late_bytes - late_bytes % FRAME_BYTES, len(audio))
+        if skipped <= 0:
+            return 0
+        del audio[:skipped]
+        if not audio:
+            self._segments.popleft()
+        self._buffered_bytes -= skipped
+        self._count_dropped(skipped, "late")
+
+        skipped_ms = skipped / BYTES_PER_MS
+        item = self._items.get(item_id)
+        if item is not None:
+            item[0] -= skipped_ms / 1000
+            item[1] += skipped_ms
+        return skipped_ms / 1000
+
+    async def _wait_out_stall(self, send):
+        """
+        Drops outbound audio while a slow send drains. Returns True once it
+        has, or False after closing a socket that never did.
+        """
+        logger.warning(
+            f"Twilio send took over {SEND_TIMEOUT}s. Dropping outbound audio."
+        )
+        self.stalled = True
+        self._count_dropped(self._buffered_bytes, "stalled")
+        self.flush()
+        try:
+            await asyncio.wait_for(send, STALL_LIMIT)
+        except TimeoutError:
+            logger.error(
+                f"Twilio send blocked for over {SEND_TIMEOUT + STALL_LIMIT}s. "
+                "Ending the call."
+            )
+            try:
+                async with asyncio.timeout(SEND_TIMEOUT):
+                    await self.twilio_ws.close()
+            except Exception as e:
+                logger.debug(f"Error closing stalled Twilio WebSocket: {e}")
+            return False
+        self.stalled = False
+        logger.info("Twilio socket drained. Outbound audio resumed.")
+        return True
+
+    def _next_frame(self):
+        item_id, audio = self._segments[0]
+        frame = bytes(audio[:FRAME_BYTES])
+        del audio[:FRAME_BYTES]
+        if not audio:
+            self._segments.popleft()
+        self._buffered_bytes -= len(frame)
+        return item_id, frame
+
+    async def _run(self):
+        next_send_at = None
+        try:
+            while True:
+                if not self._segments:
+                    self._data_ready.clear()
+                    await self._data_ready.wait()
+                    # After an underrun, resume from the playout clock: Twilio
+                    # may still be playing what was sent before it
+                    next_send_at = None
+
+                if isinstance(self._segments[0][1], str):
+                    # Marks go out as soon as the audio before them has been sent
+                    _, mark_name = self._segments.popleft()
+                    await self.twilio_ws.send_text(
+                        build_twilio_mark(self.stream_sid, mark_name)
+                    )
+                    continue
+
+                now = time.monotonic()
+                if next_send_at is None:
+                    next_send_at = (
+                        max(now, self._playout_end) - self.lead_frames * FRAME_MS / 1000
+                    )
+                if next_send_at > now:
+                    await asyncio.sleep(next_send_at - now)
+                    if not self._segments or isinstance(self._segments[0][1], str):
+                        continue  # Flushed, or a mark is next
+                    now = time.monotonic()
+                elif now - next_send_at > MAX_LATE_MS / 1000:
+                    # Sends are falling behind: catch up rather than drift
+                    late_bytes = int((now - next_send_at) * 1000) * BYTES_PER_MS
+                    next_send_at += self._skip_late(late_bytes)
+                    if not self._segments or isinstance(self._segments[0][1], str):
+                        continue
+
+                item_id, frame = self._next_frame()
+                frame_ms = len(frame) / BYTES_PER_MS
+                payload = binascii.b2a_base64(frame, newline=False).decode("ascii")
+                send = asyncio.ensure_future(
+                    self.twilio_ws.send_text(
+                        build_twilio_media(self.media_prefix, payload)
+                    )
+                )
+                try:
+                    # Shielded, so a slow send can still finish after the timeout
+                    await asyncio.wait_for(asyncio.shield(send), SEND_TIMEOUT)
+                except TimeoutError:
+                    if not await self._wait_out_stall(send):
+                        return
+                    # This frame went out late; restart the clock from here
+                    now = time.monotonic()
+                    next_send_at = now - self.lead_frames * FRAME_MS / 1000
+
+                playout_start = max(self._playout_end, now)
+                item = self._items.get(item_id)
+                if item is None:
+                    self._items[item_id] = [playout_start, frame_ms]
+                else:
+                    item[1] += frame_ms
+                self._playout_end = playout_start + frame_ms / 1000
+                next_send_at += frame_ms / 1000
+                if self.on_frame is not None:
+                    self.on_frame(frame, playout_start)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if twilio_connected(self.twilio_ws):
+                logger.error(f"Error in outbound audio pacer: {e}")
+            else:
+                # The call hung up while audio was still queued
+                logger.debug("Twilio WebSocket closed. Outbound pacer stopped.")
@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from twilio.http import HttpClient
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.response import Response
+from twilio.rest import Client
+from api.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+from api.config import logger
+
+TWILIO_MAX_WORKERS = 16  # Concurrent Twilio REST requests per process
+TWILIO_HTTP_TIMEOUT = 10.0
+TWILIO_MAX_RETRIES = 2
+# "1" swaps the HTTP transport for FakeTwilioHttpClient (local runs and load tests)
+TWILIO_FAKE_TRANSPORT = os.getenv("TWILIO_FAKE_TRANSPORT", "0") == "1"
+TWILIO_FAKE_LATENCY = float(os.getenv("TWILIO_FAKE_LATENCY", "0.05"))
+
+
+class FakeTwilioHttpClient(HttpClient):
+    """
+    In-process stand-in for the Twilio REST API. Call creation returns a
+    queued call resource after `latency` seconds; every request is recorded
+    in `requests` so tests can assert on what would have been sent.
+    """
+
+    def __init__(self, latency=TWILIO_FAKE_LATENCY):
+        super().__init__(logger, False, None)
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+        self._sids = itertools.count(1)
+
+    def request(
+        self,
+        method,
+        uri,
+        params=None,
+        data=None,
+        headers=None,
+        auth=None,
+        timeout=None,
+        allow_redirects=False,
+    ):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests.append({"method": method, "uri": uri, "data": data})
+            sid = f"CA{next(self._sids):032x}"
+        body = {
+            "sid": sid,
+            "account_sid": TWILIO_ACCOUNT_SID,
+            "to": (data or {}).get("To"),
+            "from": (data or {}).get("From"),
+            "status": "queued",
+        }
+        return Response(201, json.dumps(body), headers={})
+
+
+def create_http_client():
+    """
+    Builds a keep-alive HTTP transport whose connection pool is as large as
+    the executor, so every worker thread reuses a warm TLS connection.
+    """
+    http_client = TwilioHttpClient(
+        pool_connections=True,
+        timeout=TWILIO_HTTP_TIMEOUT,
+    )
+    http_client.session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=TWILIO_MAX_WORKERS,
+            max_retries=TWILIO_MAX_RETRIES,
+        ),
+    )
+    return http_client
+
+
+class TwilioRestClient:
+    """
+    Application-scoped Twilio REST client. Created once in the FastAPI
+    lifespan; the SDK is blocking, so calls run on a bounded thread pool
+    instead of the event loop.
+    """
+
+    def __init__(self, fake_transport=TWILIO_FAKE_TRANSPORT):
+        self.fake_transport = fake_transport
+        self.client = None
+        self._executor = None
+
+    def start(self, http_client=None):
+        if self.client is not None:
+            return
+        if http_client is None:
+            http_client = (
+                FakeTwilioHttpClient() if self.fake_transport else create_http_client()
+            )
+        self.client = Client(
+            TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=http_client
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=TWILIO_MAX_WORKERS, thread_name_prefix="twilio"
+        )
+        if isinstance(http_client, FakeTwilioHttpClient):
+            logger.warning("Twilio REST client is using the fake transport.")
+
+    async def stop(self):
+        if self.client is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True)
+        session = getattr(self.client.http_client, "session", None)
+        if session is not None:
+            session.close()
+        self.client = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs `fn(client, *args, **kwargs)` on the Twilio thread pool."""
+        if self.client is None:
+            # Scripts and tests that never ran the lifespan
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: fn(self.client, *args, **kwargs)
+        )
+
+
+twilio_rest = TwilioRestClient()
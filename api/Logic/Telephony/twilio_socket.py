@@ -0,0 +1,14 @@
+from starlette.websockets import WebSocketState
+
+
+def twilio_connected(twilio_ws):
+    """
+    True while the Twilio media websocket is open on both sides.
+    WebSocketState is a plain Enum, so it must not be compared to integers;
+    the application state also turns DISCONNECTED once we have closed it.
+    """
+    return (
+        twilio_ws is not None
+        and twilio_ws.client_state == WebSocketState.CONNECTED
+        and twilio_ws.application_state == WebSocketState.CONNECTED
+    )
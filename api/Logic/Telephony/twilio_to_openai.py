@@ -1,5 +1,26 @@
+import binascii
 import json
+import time
 from api.config import logger
+from api.Utilities.hot_logging import hot_path, FrameSampler
+from api.Utilities.metrics import (
+    INBOUND_FRAMES_DROPPED,
+    LINE_EVENTS,
+    LOCAL_BARGE_INS,
+    STREAM_ERRORS,
+)
+from api.Logic.AI.speech_helpers import interrupt_assistant
+from api.Logic.Telephony.media_codec import (
+    extract_media_payload,
+    extract_media_timestamp,
+    build_audio_append,
+)
+
+
+def _report_line_events(call_metrics, events):
+    for kind, detail in events:
+        call_metrics.count(kind, LINE_EVENTS.labels(kind))
+        logger.warning(f"Call {call_metrics.call_id} line quality: {kind} ({detail})")
 
 
 async def twilio_to_openai_stream(twilio_ws, openai_ws, stream_context):
@@ -9,40 +30,119 @@ async def twilio_to_openai_stream(twilio_ws, openai_ws, stream_context):
     """
     logger.debug("Waiting for Twilio events...")
     initialized = False
+    sampler = FrameSampler("Twilio → OpenAI")
+    call_metrics = stream_context["metrics"]
+    recording = stream_context.get("recording")
+    line_quality = stream_context.get("line_quality")
+    # Decides which frames reach OpenAI; None forwards every frame
+    local_vad = stream_context.get("local_vad")
+    # Merges frames into fewer appends; None sends one append per frame
+    coalescer = stream_context.get("inbound_coalescer")
+    # Local consumers of the caller's audio; each frame is decoded once for them
+    inspect_audio = recording is not None or line_quality is not None
+
+    async def forward(audio_payload, media_timestamp):
+        frame = None
+        interrupt = False
+        payloads = (audio_payload,)
+        if local_vad is not None:
+            frame = binascii.a2b_base64(audio_payload)
+            payloads, interrupt = local_vad.process(audio_payload, frame)
+        if coalescer is not None:
+            if frame is None:
+                frame = binascii.a2b_base64(audio_payload)
+            merged = []
+            for payload in payloads:
+                # Frames the local VAD held back earlier are still base64
+                if payload is audio_payload:
+                    merged.append(coalescer.add(frame))
+                else:
+                    merged.append(coalescer.add(binascii.a2b_base64(payload)))
+            if not payloads:
+                # The local VAD is holding audio back; send what's buffered now
+                merged.append(coalescer.flush())
+            payloads = [payload for payload in merged if payload is not None]
+        if openai_ws and openai_ws.close_code is None:
+            for payload in payloads:
+                await openai_ws.send(build_audio_append(payload))
+                sampler.frame(len(payload))
+        else:
+            call_metrics.count("inbound_dropped", INBOUND_FRAMES_DROPPED)
+            if hot_path.debug:
+                logger.debug("OpenAI WebSocket is closed. Dropping audio.")
+        if inspect_audio:
+            # After forwarding, so it never delays OpenAI
+            if frame is None:
+                frame = binascii.a2b_base64(audio_payload)
+            if recording is not None:
+                recording.inbound(frame, media_timestamp)
+            if line_quality is not None:
+                events = line_quality.add(frame)
+                if events:
+                    _report_line_events(call_metrics, events)
+        if interrupt and stream_context.get("last_assistant_item"):
+            call_metrics.count("local_barge_ins", LOCAL_BARGE_INS)
+            logger.info("Local VAD heard the caller. Interrupting AI response.")
+            await interrupt_assistant(
+                stream_context["openai_router"], twilio_ws, stream_context
+            )
+
+    async def send_remainder():
+        """Sends the caller audio still buffered in the coalescer, if any."""
+        payload = coalescer.flush() if coalescer is not None else None
+        if payload is not None and openai_ws and openai_ws.close_code is None:
+            await openai_ws.send(build_audio_append(payload))
+            sampler.frame(len(payload))
+
     try:
         async for message in twilio_ws.iter_text():
+            # Fast path: media frames are forwarded without a full JSON parse
+            audio_payload = extract_media_payload(message)
+            if audio_payload is not None:
+                media_timestamp = extract_media_timestamp(message)
+                if media_timestamp is not None:
+                    stream_context["latest_media_timestamp"] = media_timestamp
+                await forward(audio_payload, media_timestamp)
+                continue
+
             data = json.loads(message)
             event_type = data.get("event", "UNKNOWN")
-            logger.debug(f"Received Twilio event: {event_type}")
+            if hot_path.debug:
+                logger.debug("Received Twilio event: %s", event_type)
 
             if event_type == "start" and not initialized:
                 initialized = True
                 stream_context["stream_sid"] = data["start"]["streamSid"]
+                if recording is not None:
+                    # Twilio media timestamps count from here
+                    recording.started_at = time.monotonic()
                 stream_context["stream_ready"].set()
                 logger.info(
                     f"Twilio audio stream started: {stream_context['stream_sid']}"
                 )
 
             elif event_type == "media":
+                # Media frame in an unexpected layout, forward via the slow path
                 audio_payload = data["media"]["payload"]
-                logger.debug(
-                    f"Received {len(audio_payload)} bytes of audio from Twilio."
-                )
-
-                # Directly forward audio to OpenAI in real-time
-                if openai_ws and openai_ws.close_code is None:
-                    openai_audio_packet = {
-                        "type": "input_audio_buffer.append",
-                        "audio": audio_payload,
-                    }
-                    await openai_ws.send(json.dumps(openai_audio_packet))
-                    logger.debug(
-                        f"Forwarded {len(audio_payload)} bytes of audio to OpenAI."
+                if "timestamp" in data["media"]:
+                    stream_context["latest_media_timestamp"] = int(
+                        data["media"]["timestamp"]
                     )
-                else:
-                    logger.debug("OpenAI WebSocket is closed. Dropping audio packet.")
+                await forward(audio_payload, stream_context["latest_media_timestamp"])
+
+            elif event_type == "mark":
+                # Twilio finished playing everything sent before this mark
+                mark_queue = stream_context.get("mark_queue")
+                mark_name = data.get("mark", {}).get("name")
+                # Marks sent before a clear are still echoed; they belong
+                # to audio already cut off and must not drain newer marks
+                if mark_queue and mark_name in mark_queue:
+                    while mark_queue.popleft() != mark_name:
+                        pass
+                    stream_context["last_played_mark"] = mark_name
 
             elif event_type == "stop":
+                await send_remainder()
                 await twilio_ws.close()
                 logger.info("Twilio call ended.")
                 break
@@ -50,6 +150,12 @@ async def twilio_to_openai_stream(twilio_ws, openai_ws, stream_context):
                 logger.warning(f"Unexpected Twilio event type received: {event_type}")
 
     except Exception as e:
+        STREAM_ERRORS.labels("twilio_to_openai").inc()
         logger.error(f"Error in twilio_to_openai_stream: {e}")
     finally:
+        # The stream ended without a stop event; don't lose the caller's last words
+        try:
+            await send_remainder()
+        except Exception as e:
+            logger.error(f"Error sending buffered caller audio: {e}")
         logger.debug("Twilio WebSocket disconnected.")
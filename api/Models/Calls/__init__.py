@@ -1,5 +1,16 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
+
+
+class LocalVadSettings(BaseModel):
+    # Unset fields keep the server's LOCAL_VAD defaults
+    mode: Optional[Literal["off", "thin", "suppress"]] = None
+    threshold_dbfs: Optional[float] = None  # Quieter frames count as silence
+    hangover_ms: Optional[int] = None  # Default: server VAD silence + margin
+    prefix_padding_ms: Optional[int] = None  # Default: server VAD prefix padding
+    keepalive_ms: Optional[int] = None  # "thin" forwards one silent frame this often
+    barge_in: Optional[bool] = None  # Interrupt the AI before OpenAI's speech_started
+    barge_in_ms: Optional[int] = None
 
 
 class CallRequest(BaseModel):
@@ -11,6 +22,7 @@ class CallRequest(BaseModel):
     availability: List[dict]
     issue: str
     language: str
+    local_vad: Optional[LocalVadSettings] = None
 
 
 class ActiveCall(BaseModel):
@@ -0,0 +1,67 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from api.Models.Calls import CallRequest
+
+
+class CallingWindow(BaseModel):
+    start: str = "09:00"  # Local time, 24-hour
+    end: str = "18:00"  # Before start for a window that runs past midnight
+    timezone: str = "UTC"  # IANA name, e.g. "America/Los_Angeles"
+    weekdays: List[int] = [0, 1, 2, 3, 4]  # Monday is 0; the day the window opens
+
+    @field_validator("start", "end")
+    @classmethod
+    def hh_mm(cls, value):
+        try:
+            datetime.strptime(value, "%H:%M")
+        except ValueError:
+            raise ValueError(f"Expected a 24-hour HH:MM time, got {value!r}")
+        return value
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {value}")
+        return value
+
+    @field_validator("weekdays")
+    @classmethod
+    def valid_weekdays(cls, value):
+        if not value or any(day not in range(7) for day in value):
+            raise ValueError("weekdays must list at least one day from 0 to 6")
+        return value
+
+    @model_validator(mode="after")
+    def opens_and_closes(self):
+        if self.start == self.end:
+            raise ValueError("A calling window must not start and end at the same time")
+        return self
+
+
+class CampaignSettings(BaseModel):
+    max_concurrency: int = Field(10, ge=1)  # Calls ringing or in progress at once
+    calls_per_second: float = Field(1.0, gt=0)
+    max_attempts: int = Field(3, ge=1)
+    retry_delay_seconds: int = Field(600, ge=0)
+    retry_statuses: List[str] = ["busy", "no-answer"]
+    calling_windows: Dict[str, CallingWindow] = {}  # Keyed by company
+
+
+class CampaignRequest(CampaignSettings):
+    calls: List[CallRequest]
+
+
+class CampaignStatus(BaseModel):
+    campaign_id: str
+    state: str
+    total: int
+    queued: int
+    in_progress: int
+    completed: int
+    failed: int
+    retries: int
@@ -2,58 +2,89 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 from twilio.twiml.voice_response import Connect, VoiceResponse
-from twilio.rest import Client
-from api.config import (
-    DOMAIN,
-    TWILIO_ACCOUNT_SID,
-    TWILIO_AUTH_TOKEN,
-    TWILIO_PHONE_NUMBER,
-)
+from api.config import DOMAIN
 from api.config import logger
 from api.Logic.Orchestration.orchestration import orchestrate_audio_streams
-from api.Logic.AI.setup import connect_to_openai, send_session_update
-from api.Logic.AI.tool_helpers import post_call_actions
+from api.Logic.AI.connection_pool import (
+    prepare_session,
+    take_session,
+    discard_session,
+)
+from api.Logic.AI.transcript import transcript_path
+from api.Logic.PostCall.queue import post_call_queue
+from api.Logic.Telephony.outbound import place_call
+from api.Logic.Telephony.dialer import campaign_dialer
+from api.Logic.Telephony.twilio_socket import twilio_connected
+from api.Logic.State.call_store import call_store
+from api.Logic.State.capacity import call_capacity, CapacityError
+from api.Logic.State.worker_inbox import worker_inbox, WORKER_ID
 from api.Models.Calls import CallRequest, ActiveCall
-import uuid
-import asyncio
+from api.Routers.campaigns import router as campaigns_router
+from api.Utilities.metrics import OPENAI_READY
+import time
 
-active_calls = {}
-sid_id_map = {}
+# Live OpenAI sessions can't be shared, so this map stays process-local.
+# Entries are removed when Twilio reports the call's final status.
 websocket_map = {}
 
+# Call metadata fields naming the workers that hold live state for a call
+OWNER_FIELDS = ("worker_id", "session_worker", "stream_worker")
+
 router = APIRouter()
+router.include_router(campaigns_router)
+
+
+async def _end_call_locally(call_id, call_status):
+    """Releases whatever this worker holds for a call that has ended."""
+    # Let a bulk campaign retry busy/no-answer calls
+    campaign_dialer.on_call_status(call_id, call_status)
+    call_capacity.release(call_id)
+    # Release an OpenAI session prepared for a call whose stream never started
+    await discard_session(call_id)
+    openai_router = websocket_map.pop(call_id, None)
+    if openai_router is not None:
+        # Post-call work no longer needs the live session
+        await openai_router.close()
+
+
+async def _stream_moved(call_id):
+    """The call's media stream started on another worker."""
+    call_capacity.release(call_id)
+    await discard_session(call_id)
+
+
+worker_inbox.register("call_ended", _end_call_locally)
+worker_inbox.register("stream_moved", _stream_moved)
+
+
+async def _claim_stream(call_id, call_metadata):
+    """
+    Records this worker as the owner of the call's stream, and tells the
+    workers that dialed or prepared it that they can let go.
+    """
+    if not call_store.shared:
+        return
+    for owner in {call_metadata.get("worker_id"), call_metadata.get("session_worker")}:
+        if owner and owner != WORKER_ID:
+            await worker_inbox.send(owner, "stream_moved", call_id=call_id)
+    await call_store.update(call_id, stream_worker=WORKER_ID)
 
 
 @router.post("/call", response_model=ActiveCall)
 async def make_call(call_request: CallRequest):
     """API to trigger an outgoing call via Twilio."""
     try:
-        call_id = str(uuid.uuid4())
-
-        # initialize Twilio Client
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        call = twilio_client.calls.create(
-            to=call_request.phone_number,
-            from_=TWILIO_PHONE_NUMBER,
-            url=f"https://{DOMAIN}/twilio/call-initiate/{call_id}",
-            status_callback=f"https://{DOMAIN}/twilio/call-completed",
-            status_callback_event=["completed"],
-            status_callback_method="POST",
-        )
-        logger.info(f"Call initiated successfully: {call_id}")
-
-        call_metadata = {
-            "call_id": call_id,
-            "twilio_call_sid": call.sid,
-            "call_status": call.status,
-            "twilio_call_sid": call.sid,
-            **call_request.model_dump(),
-        }
-        active_calls[call_id] = call_metadata
-        sid_id_map[call.sid] = call_id
-        logger.info(f"Call metadata stored: {call_metadata}")
-
+        # Twilio REST runs on a worker thread, not the event loop
+        call_metadata = await place_call(call_request)
         return ActiveCall(**call_metadata)
+    except CapacityError as e:
+        # Another call now would degrade every call in progress
+        logger.warning(f"Refused call: {e.reason}. Capacity: {call_capacity.status()}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server at capacity ({e.reason}). Try again later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"Error making call: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error making call: {str(e)}")
@@ -69,6 +100,12 @@ async def twilio_call_initiate(call_id: str):
 
     try:
         logger.info("Received Twilio call webhook")
+        call_metadata = await call_store.get(call_id)
+        if call_metadata and not call_metadata.get("session_worker"):
+            # Get the OpenAI session ready while Twilio connects the stream
+            prepare_session(call_id, call_metadata)
+            await call_store.update(call_id, session_worker=WORKER_ID)
+
         twiml_response = VoiceResponse()
         connect = Connect()
         connect.stream(
@@ -93,40 +130,42 @@ async def handle_call_stream(twilio_ws: WebSocket, call_id: str):
 
     try:
         await twilio_ws.accept()
+        accepted_at = time.perf_counter()
         logger.info(f"Twilio WebSocket connection accepted")
 
-        openai_ws = None
-        for attempt in range(3):
-            openai_ws = await connect_to_openai()
-            logger.info(f"OpenAI WebSocket connection attempt {attempt+1}")
-            if openai_ws:
-                break
-            logger.warning(f"Retrying OpenAI connection ({attempt+1}/3)...")
-            await asyncio.sleep(1)
-        websocket_map[call_id] = openai_ws
-
-        if not openai_ws:
-            logger.error("Failed to connect to AI. Closing Twilio WebSocket.")
+        call_metadata = await call_store.get(call_id)
+        if not call_metadata:
+            logger.error(f"Call ID {call_id} not found in active calls.")
             await twilio_ws.close()
             return
 
-        call_metadata = active_calls.get(call_id)
-        if not call_metadata:
-            logger.error(f"Call ID {call_id} not found in active calls.")
+        if not call_capacity.admit_stream(call_id):
+            logger.error(f"No capacity for call {call_id}. Closing Twilio WebSocket.")
             await twilio_ws.close()
             return
-        await send_session_update(openai_ws, call_metadata)
+        await _claim_stream(call_id, call_metadata)
+
+        # Pre-warmed and already configured for this call in most cases
+        openai_router = await take_session(call_id, call_metadata)
+        call_capacity.record_openai(openai_router is not None)
+        if not openai_router:
+            logger.error("Failed to connect to AI. Closing Twilio WebSocket.")
+            await twilio_ws.close()
+            return
+        OPENAI_READY.observe(time.perf_counter() - accepted_at)
+        websocket_map[call_id] = openai_router
 
         logger.debug("Starting audio streaming...")
         try:
-            await orchestrate_audio_streams(twilio_ws, openai_ws, call_metadata)
+            await orchestrate_audio_streams(twilio_ws, openai_router, call_metadata)
         except Exception as e:
             logger.error(f"Error during audio streaming: {str(e)}")
         finally:
             logger.info("Closing both WebSockets.")
-            await twilio_ws.close()
-            if openai_ws and openai_ws.close_code is None:
-                await openai_ws.close()
+            if twilio_connected(twilio_ws):
+                await twilio_ws.close()
+            await openai_router.close()
+            call_capacity.release(call_id)
         logger.info("WebSocket connections closed.")
     except WebSocketDisconnect as e:
         logger.warning(f"WebSocket disconnected: {str(e)}")
@@ -150,21 +189,28 @@ async def twilio_call_completed(request: Request):
     logger.info(f"Call status: {call_status}")
     call_sid = twilio_data.get("CallSid")
     logger.info(f"Call SID: {call_sid}")
-    call_id = sid_id_map.get(call_sid)
+    call_id = await call_store.call_id_for_sid(call_sid)
     logger.info(f"Call ID: {call_id}")
     if not call_id:
         logger.error(f"Call SID {call_sid} not found in active calls.")
         return {"status": "error", "message": "Call not found."}
 
-    if call_status == "completed":
-        openai_ws = websocket_map.get(call_id)
-        logger.info(f"Websocket: {openai_ws}")
-
-        call_metadata = active_calls.get(call_id)
-        call_metadata["call_status"] = call_status
+    call_metadata = await call_store.update(call_id, call_status=call_status)
+    if call_metadata is None:
+        logger.warning(f"Call {call_id} expired from the call store before its status.")
+    # The callback can land on any worker; each owner releases its own state
+    owners = {WORKER_ID}
+    owners.update((call_metadata or {}).get(field) for field in OWNER_FIELDS)
+    owners.discard(None)
+    for owner in owners:
+        await worker_inbox.send(
+            owner, "call_ended", call_id=call_id, call_status=call_status
+        )
 
-        logger.info(f"Call {call_id} ended. Processing post-call actions...")
-        asyncio.create_task(
-            post_call_actions(call_id, openai_ws, twilio_data, call_metadata)
-        )  # Process asynchronously
+    if call_status == "completed" and call_metadata is not None:
+        logger.info(f"Call {call_id} ended. Queueing post-call actions...")
+        # Processed by a post-call worker once the transcript is saved
+        await post_call_queue.enqueue(
+            call_id, call_metadata, twilio_data, transcript_path(call_id)
+        )
     return {"status": "received"}
@@ -0,0 +1,101 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+from api.config import logger
+from api.Logic.State.call_store import call_store
+from api.Logic.State.worker_inbox import worker_inbox
+from api.Logic.Telephony.dialer import campaign_dialer
+from api.Models.Calls import CallRequest
+from api.Models.Campaigns import CampaignRequest, CampaignStatus
+
+router = APIRouter(prefix="/campaigns")
+
+
+async def _cancel_locally(campaign_id):
+    campaign_dialer.cancel(campaign_id)
+
+
+worker_inbox.register("cancel_campaign", _cancel_locally)
+
+
+@router.post("", response_model=CampaignStatus)
+async def create_campaign(campaign_request: CampaignRequest):
+    """Starts dialing a list of calls in the background."""
+    campaign = campaign_dialer.submit(campaign_request)
+    return CampaignStatus(**campaign.status())
+
+
+@router.post("/jsonl", response_model=CampaignStatus)
+async def create_campaign_jsonl(
+    request: Request,
+    max_concurrency: int = 10,
+    calls_per_second: float = 1.0,
+    max_attempts: int = 3,
+    retry_delay_seconds: int = 600,
+    calling_windows: Optional[str] = None,
+):
+    """
+    Starts a campaign from a JSONL body, one CallRequest per line.
+    Dialer settings are passed as query parameters; `calling_windows` is a
+    JSON object of company -> CallingWindow.
+    """
+    body = (await request.body()).decode("utf-8")
+    calls = []
+    errors = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            calls.append(CallRequest.model_validate_json(line))
+        except ValidationError as e:
+            errors.append({"line": line_number, "errors": e.errors()})
+
+    if errors:
+        logger.warning(f"Rejected campaign upload with {len(errors)} invalid lines.")
+        raise HTTPException(status_code=422, detail=errors[:100])
+    if not calls:
+        raise HTTPException(status_code=422, detail="No calls in request body.")
+
+    try:
+        campaign_request = CampaignRequest(
+            calls=calls,
+            max_concurrency=max_concurrency,
+            calls_per_second=calls_per_second,
+            max_attempts=max_attempts,
+            retry_delay_seconds=retry_delay_seconds,
+            calling_windows=json.loads(calling_windows) if calling_windows else {},
+        )
+    except (ValidationError, json.JSONDecodeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    campaign = campaign_dialer.submit(campaign_request)
+    return CampaignStatus(**campaign.status())
+
+
+@router.get("/{campaign_id}", response_model=CampaignStatus)
+async def get_campaign(campaign_id: str):
+    """Returns a campaign's progress counters."""
+    campaign = campaign_dialer.campaigns.get(campaign_id)
+    if campaign:
+        return CampaignStatus(**campaign.status())
+    # Running in another worker
+    status = await call_store.get(f"campaign:{campaign_id}")
+    if not status:
+        raise HTTPException(status_code=404, detail="Campaign not found.")
+    return CampaignStatus(**status)
+
+
+@router.delete("/{campaign_id}", response_model=CampaignStatus)
+async def cancel_campaign(campaign_id: str):
+    """Stops dialing new calls for a campaign. Calls in progress continue."""
+    campaign = campaign_dialer.cancel(campaign_id)
+    if campaign:
+        return CampaignStatus(**campaign.status())
+    # Running in another worker: ask it to cancel
+    status = await call_store.get(f"campaign:{campaign_id}")
+    if not status:
+        raise HTTPException(status_code=404, detail="Campaign not found.")
+    await worker_inbox.send(
+        status["worker_id"], "cancel_campaign", campaign_id=campaign_id
+    )
+    return CampaignStatus(**{**status, "state": "cancelling"})
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from array import array
+from api.config import logger
+from api.Utilities.date_conversions import booked_minutes, subtract_booked
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; there only one process may use the log
+    fcntl = None
+
+APPOINTMENTS_LOG = os.getenv("APPOINTMENTS_LOG", "appointments.jsonl")
+APPOINTMENTS_JSON = "appointments.json"  # Legacy format, produced by export_json
+
+
+class SlotTakenError(Exception):
+    """The requested slot overlaps an appointment already booked with the company."""
+
+    def __init__(self, appointment, booked):
+        super().__init__(
+            f"{appointment.get('company')} is already booked on "
+            f"{booked.get('date')} at {booked.get('time')}"
+        )
+        self.booked = booked
+
+
+class AppointmentStore:
+    """
+    Append-only JSONL appointment log with in-memory indexes.
+
+    A booking is one appended line, written on a dedicated thread, so it is O(1)
+    and never blocks the event loop. Lines written by other processes are
+    picked up by tailing the file from the last offset read, and a log
+    replaced by another process's `compact` is re-read from the start.
+    Indexes cover issue_id, call_id, date and company. `compact` rewrites
+    the log and `export_json` produces the legacy appointments.json list.
+
+    Several workers can share the log: the legacy import, appends, compaction
+    and export all hold an exclusive lock on `<log>.lock`.
+    """
+
+    def __init__(self, path=APPOINTMENTS_LOG, legacy_path=APPOINTMENTS_JSON):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="appointments"
+        )
+        self._lock = threading.Lock()
+        self._file_lock_depth = 0
+        self._loaded = False
+        self._inode = None
+        self._offset = 0
+        self._records = []
+        self._by_issue_id = {}
+        self._by_call_id = {}
+        self._by_date = {}
+        self._by_company = {}
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Serializes writers across processes. Re-entrant; callers already hold
+        self._lock, which keeps the depth count consistent.
+        """
+        if self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._file_lock_depth = 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self, inode):
+        self._inode = inode
+        self._offset = 0
+        self._records = []
+        for index in (
+            self._by_issue_id,
+            self._by_call_id,
+            self._by_date,
+            self._by_company,
+        ):
+            index.clear()
+
+    def _index(self, record):
+        position = len(self._records)
+        self._records.append(record)
+        for index, key in (
+            (self._by_issue_id, record.get("issue_id")),
+            (self._by_call_id, record.get("call_id")),
+            (self._by_date, record.get("date")),
+            (self._by_company, record.get("company")),
+        ):
+            if key is not None:
+                index.setdefault(key, []).append(position)
+
+    def _import_legacy(self):
+        """Seeds the log from appointments.json the first time it is used."""
+        if not os.path.exists(self.legacy_path):
+            return
+        with self._file_lock():
+            # Checked under the lock, so only the first worker imports
+            if not os.path.exists(self.path):
+                self._write_legacy_import()
+
+    def _write_legacy_import(self):
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Could not import {self.legacy_path}: {e}")
+            return
+        if isinstance(legacy, list) and legacy:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(record, ensure_ascii=False) + "\n" for record in legacy
+                )
+            logger.info(f"Imported {len(legacy)} appointments from {self.legacy_path}")
+
+    def _refresh(self):
+        """Indexes any lines appended since the last read (by any process)."""
+        if not self._loaded:
+            self._import_legacy()
+            self._loaded = True
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Replaced (compacted) by another process since we last read it
+            self._reset(stat.st_ino)
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self._offset)
+            while True:
+                line = f.readline()
+                if not line.endswith("\n"):
+                    break  # Partial line still being written
+                self._offset = f.tell()
+                try:
+                    self._index(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line in {self.path}")
+
+    def _append(self, record):
+        # One write of one line, locked so it can't land in a log that
+        # another process is about to replace, nor race its duplicate
+        with self._lock, self._file_lock():
+            self._refresh()
+            call_id = record.get("call_id")
+            if call_id is not None and call_id in self._by_call_id:
+                return False
+            booked = self._overlapping(record)
+            if booked is not None:
+                raise SlotTakenError(record, booked)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._refresh()
+            return True
+
+    def _overlapping(self, record):
+        """
+        Returns the company's booking that overlaps `record`'s slot, or None.
+        Other calls may have been offered the same slot; whoever books first wins.
+        """
+        minutes = booked_minutes([record])
+        company = record.get("company")
+        if not minutes or company is None:
+            return None
+        for position in self._by_company.get(company, ()):
+            booked = self._records[position]
+            if not subtract_booked(array("q", minutes), booked_minutes([booked])):
+                return booked
+        return None
+
+    def _find(self, issue_id, call_id, date, company):
+        with self._lock:
+            self._refresh()
+            positions = None
+            for index, key in (
+                (self._by_issue_id, issue_id),
+                (self._by_call_id, call_id),
+                (self._by_date, date),
+                (self._by_company, company),
+            ):
+                if key is None:
+                    continue
+                matches = set(index.get(key, ()))
+                positions = matches if positions is None else positions & matches
+            if positions is None:
+                return list(self._records)
+            return [self._records[i] for i in sorted(positions)]
+
+    def _compact(self):
+        with self._lock, self._file_lock():
+            self._refresh()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(record, ensure_ascii=False) + "\n"
+                    for record in self._records
+                )
+            os.replace(tmp_path, self.path)
+            stat = os.stat(self.path)
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+            return len(self._records)
+
+    def _export_json(self, path):
+        with self._lock, self._file_lock():
+            self._refresh()
+            records = list(self._records)
+            # Every worker exports on shutdown; the first one leaves nothing to do
+            if os.path.exists(path) and os.path.exists(self.path):
+                if os.path.getmtime(path) > os.path.getmtime(self.path):
+                    return len(records)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, path)
+            return len(records)
+
+    async def add(self, appointment):
+        """
+        Appends one appointment. Returns False, writing nothing, if the call
+        it came from already booked one: a retried tool call books once.
+        Raises SlotTakenError if the slot overlaps one the company already has.
+        """
+        return await self._run(self._append, appointment)
+
+    async def find(self, issue_id=None, call_id=None, date=None, company=None):
+        """Returns appointments matching every given key, oldest first."""
+        return await self._run(self._find, issue_id, call_id, date, company)
+
+    async def compact(self):
+        """
+        Rewrites the log without malformed or partial lines.
+        Run it when no other process is writing bookings.
+        """
+        return await self._run(self._compact)
+
+    async def export_json(self, path=None):
+        """Writes every appointment to `path` in the legacy appointments.json format."""
+        return await self._run(self._export_json, path or self.legacy_path)
+
+
+appointment_store = AppointmentStore()
+
+
+if __name__ == "__main__":
+    # python -m api.Tools.appointment_store [compact|export]
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "compact":
+        count = asyncio.run(appointment_store.compact())
+        print(f"Compacted {appointment_store.path}: {count} appointments")
+    else:
+        count = asyncio.run(appointment_store.export_json())
+        print(f"Exported {count} appointments to {appointment_store.legacy_path}")
@@ -0,0 +1,48 @@
+DEFAULT_TOOL_TIMEOUT = 10.0  # Seconds
+
+
+class Tool:
+    """
+    A function the model can call, and how it may be run:
+    - post_call_only: refused during a live call; run by the post-call worker
+    - needs_twilio: skipped once the caller's media stream has closed
+    - timeout: seconds before the call is abandoned and reported as failed
+    - idempotent: safe to run more than once with the same arguments; calls
+      to a tool that isn't are run one after another, never concurrently
+    - responds: the model should reply once the output is in (lookups),
+      rather than the tool being a side effect it doesn't talk about
+    """
+
+    def __init__(
+        self,
+        name,
+        handler,
+        post_call_only=False,
+        needs_twilio=False,
+        timeout=DEFAULT_TOOL_TIMEOUT,
+        idempotent=False,
+        responds=False,
+    ):
+        self.name = name
+        self.handler = handler
+        self.post_call_only = post_call_only
+        self.needs_twilio = needs_twilio
+        self.timeout = timeout
+        self.idempotent = idempotent
+        self.responds = responds
+
+
+TOOLS = {}
+
+
+def tool(name, **options):
+    """
+    Registers an async handler for the tool `name`. The handler is called with
+    (function_args, twilio_ws, stream_context) and returns the output dict.
+    """
+
+    def register(handler):
+        TOOLS[name] = Tool(name, handler, **options)
+        return handler
+
+    return register
@@ -1,7 +1,8 @@
-import json
 import asyncio
-import os
 from config import logger
+from api.Tools.appointment_store import appointment_store, SlotTakenError
+from api.Tools.registry import tool
+from api.Logic.Telephony.twilio_socket import twilio_connected
 
 
 async def scheduled_appointment(
@@ -24,8 +25,6 @@ async def scheduled_appointment(
             "message": "No appointment was scheduled.",
         }
 
-    file_name = "appointments.json"
-
     # Prepare appointment data
     new_appointment = {
         "issue_id": issue_id,
@@ -39,24 +38,15 @@ async def scheduled_appointment(
     }
 
     try:
-        # Read existing data if the file exists
-        if os.path.exists(file_name):
-            try:
-                with open(file_name, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-                    if not isinstance(existing_data, list):
-                        existing_data = []
-            except json.JSONDecodeError:
-                existing_data = []
-        else:
-            existing_data = []
-
-        # Append new appointment
-        existing_data.append(new_appointment)
-
-        # Write back to file
-        with open(file_name, "w", encoding="utf-8") as f:
-            json.dump(existing_data, f, ensure_ascii=False, indent=4)
+        # Append-only write on the store's thread, off the event loop
+        if not await appointment_store.add(new_appointment):
+            # A retry of a call that timed out after its write went through
+            logger.info(f"Appointment for call {call_id} was already recorded.")
+            return {
+                "status": "success",
+                "message": "Appointment was already scheduled.",
+                "appointment": new_appointment,
+            }
 
         logger.info(
             f"Appointment scheduled for {customer_name} on {date} at {time} for issue: {issue}."
@@ -67,11 +57,25 @@ async def scheduled_appointment(
             "appointment": new_appointment,
         }
 
+    except SlotTakenError as e:
+        # Booked by a concurrent call after this one was offered the slot
+        logger.warning(f"Appointment for call {call_id} not recorded: {e}.")
+        return {
+            "status": "conflict",
+            "message": f"Slot no longer available: {e}.",
+            "appointment": new_appointment,
+        }
+
     except Exception as e:
         logger.error(f"Error saving appointment: {e}")
         return {"status": "error", "message": f"Failed to save appointment: {e}"}
 
 
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
 async def write_call_summary(call_id: str, summary: str = None):
     """Generates a summary of the call based on customer responses and saves it to a Markdown file."""
 
@@ -82,8 +86,7 @@ async def write_call_summary(call_id: str, summary: str = None):
 
     file_name = f"{call_id}.md"
     try:
-        with open(file_name, "w", encoding="utf-8") as f:
-            f.write(summary)
+        await asyncio.to_thread(_write_text, file_name, summary)
 
         logger.info(f"Summary successfully written to {file_name}")
 
@@ -103,7 +106,7 @@ async def end_call(twilio_ws, stream_context):
         stream_context["call_active"] = False
         # Notify Twilio to stop media streaming and end the call
 
-        if twilio_ws.client_state == 1:
+        if twilio_connected(twilio_ws):
             stop_event = {"event": "stop"}
             await twilio_ws.send_json(stop_event)
             await asyncio.sleep(0.1)
@@ -112,3 +115,35 @@ async def end_call(twilio_ws, stream_context):
 
     except Exception as e:
         logger.error(f"Error while ending call: {e}")
+
+
+# Handlers the model's function calls are dispatched to, by tool name
+
+
+@tool("scheduled_appointment", post_call_only=True)
+async def _scheduled_appointment_tool(function_args, twilio_ws, stream_context):
+    call_metadata = stream_context["call_metadata"]
+    output = await scheduled_appointment(
+        call_metadata["issue_id"],
+        call_metadata["phone_number"],
+        call_metadata["first_name"],
+        call_metadata["company"],
+        call_metadata["issue"],
+        function_args.get("date"),
+        function_args.get("time"),
+        call_metadata["call_id"],
+    )
+    stream_context["appointment_scheduled"] = True
+    return output
+
+
+@tool("write_call_summary", post_call_only=True, idempotent=True)
+async def _write_call_summary_tool(function_args, twilio_ws, stream_context):
+    return await write_call_summary(
+        stream_context["call_metadata"]["call_id"], function_args.get("summary")
+    )
+
+
+@tool("end_call", needs_twilio=True, timeout=5.0, idempotent=True)
+async def _end_call_tool(function_args, twilio_ws, stream_context):
+    return await end_call(twilio_ws, stream_context)
@@ -0,0 +1,202 @@
+"""
+Batch g711 ulaw decoding and line-quality analysis with lookup tables.
+
+Every call carries 8000 ulaw bytes per second per direction, so nothing here
+loops over samples in Python: decoding is one table lookup over a whole
+buffer, with NumPy when it is installed and bytes.translate otherwise.
+Level analysis needs NumPy and works on batches of 20 ms frames.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Optional; the translate fallback is slower but exact
+    np = None
+
+ULAW_SILENCE = 0xFF  # Encodes a zero sample
+FRAME_BYTES = 160  # 20 ms at 8 kHz
+FULL_SCALE = 32768
+SILENCE_DBFS = -45.0  # Frames quieter than this count as silence
+CLIP_LEVEL = 32000  # Only the loudest ulaw code reaches this
+ANALYSIS_WINDOW_MS = 200  # Frames are analyzed in batches this long
+DEAD_AIR_MS = 10000  # Silence this long on an active call is reported
+CLIPPING_RATIO = 0.01  # Clipped samples in a window before it is reported
+LOW_LEVEL_DBFS = -35.0  # Average speech level below this is reported
+LOW_LEVEL_MIN_MS = 3000  # Speech heard before the average level is judged
+EVENT_COOLDOWN_MS = 10000  # Between repeats of the same event
+
+
+def _decode_ulaw_sample(byte):
+    byte = ~byte & 0xFF
+    magnitude = ((byte & 0x0F) << 3) + 0x84
+    magnitude <<= (byte & 0x70) >> 4
+    return 0x84 - magnitude if byte & 0x80 else magnitude - 0x84
+
+
+# ulaw byte -> 16-bit linear PCM sample
+ULAW_TO_PCM16 = array("h", (_decode_ulaw_sample(b) for b in range(256)))
+
+# Little-endian halves of each sample, for the bytes.translate fallback
+_LOW_BYTES = bytes(sample & 0xFF for sample in ULAW_TO_PCM16)
+_HIGH_BYTES = bytes((sample >> 8) & 0xFF for sample in ULAW_TO_PCM16)
+
+if np is not None:
+    ULAW_TABLE = np.array(ULAW_TO_PCM16, dtype="<i2")
+    # Per-code energy and clipping, so analysis never decodes first
+    _SQUARES = ULAW_TABLE.astype(np.float64) ** 2
+    _CLIPPED = np.abs(ULAW_TABLE.astype(np.int32)) >= CLIP_LEVEL
+
+
+def ulaw_to_pcm16(ulaw):
+    """Decodes ulaw bytes to little-endian 16-bit PCM bytes."""
+    if np is not None:
+        return ULAW_TABLE[np.frombuffer(ulaw, dtype=np.uint8)].tobytes()
+    pcm = bytearray(len(ulaw) * 2)
+    pcm[0::2] = ulaw.translate(_LOW_BYTES)
+    pcm[1::2] = ulaw.translate(_HIGH_BYTES)
+    return bytes(pcm)
+
+
+def interleave_ulaw_stereo(left, right):
+    """
+    Decodes two equal-length ulaw channels into interleaved stereo 16-bit PCM.
+    """
+    if np is not None:
+        stereo = np.empty((len(left), 2), dtype="<i2")
+        stereo[:, 0] = ULAW_TABLE[np.frombuffer(left, dtype=np.uint8)]
+        stereo[:, 1] = ULAW_TABLE[np.frombuffer(right, dtype=np.uint8)]
+        return stereo.tobytes()
+    left, right = ulaw_to_pcm16(left), ulaw_to_pcm16(right)
+    stereo = bytearray(len(left) * 2)
+    stereo[0::4] = left[0::2]
+    stereo[1::4] = left[1::2]
+    stereo[2::4] = right[0::2]
+    stereo[3::4] = right[1::2]
+    return bytes(stereo)
+
+
+def frame_levels(ulaw, frame_bytes=FRAME_BYTES):
+    """
+    Returns (dBFS per frame, clipped samples per frame) as NumPy arrays for the
+    whole frames in a ulaw buffer. Requires NumPy.
+    """
+    codes = np.frombuffer(ulaw, dtype=np.uint8)
+    codes = codes[: len(codes) - len(codes) % frame_bytes].reshape(-1, frame_bytes)
+    mean_square = _SQUARES[codes].mean(axis=1)
+    # Digital silence is floored at about -90 dBFS instead of -inf
+    dbfs = 10 * np.log10(np.maximum(mean_square, 1.0) / FULL_SCALE**2)
+    return dbfs, _CLIPPED[codes].sum(axis=1)
+
+
+class LineQuality:
+    """
+    Running level, silence and clipping stats for one direction of a call.
+
+    `add` takes ulaw frames as they arrive and analyzes them once a window's
+    worth has been collected. It returns the events that window raised, as
+    (kind, detail) tuples:
+      dead_air   no speech for DEAD_AIR_MS
+      clipping   more than CLIPPING_RATIO of a window's samples clipped
+      low_level  speech averaging below LOW_LEVEL_DBFS
+    Each kind is raised at most once per EVENT_COOLDOWN_MS. Without NumPy
+    nothing is analyzed. `last_levels` holds the latest window's per-frame
+    dBFS, for callers making their own per-frame decisions.
+    """
+
+    def __init__(self, window_ms=ANALYSIS_WINDOW_MS, frame_bytes=FRAME_BYTES):
+        self.enabled = np is not None
+        self.frame_bytes = frame_bytes
+        self.frame_ms = frame_bytes * 1000 // 8000
+        self.window_bytes = window_ms // self.frame_ms * frame_bytes
+        self._batch = bytearray()
+        self.last_levels = ()
+
+        self.frames = 0
+        self.silent_frames = 0
+        self.clipped_samples = 0
+        self.speech_frames = 0
+        self.speech_dbfs_sum = 0.0
+        self.peak_dbfs = -90.0
+        self.silence_run_ms = 0
+        self.longest_silence_ms = 0
+        self.events = {}
+        self._last_event_ms = {}
+
+    @property
+    def elapsed_ms(self):
+        return self.frames * self.frame_ms
+
+    def add(self, audio):
+        if not self.enabled:
+            return ()
+        self._batch.extend(audio)
+        if len(self._batch) < self.window_bytes:
+            return ()
+        return self.flush()
+
+    def flush(self):
+        """Analyzes whatever whole frames are buffered. Returns new events."""
+        usable = len(self._batch) - len(self._batch) % self.frame_bytes
+        if not self.enabled or not usable:
+            return ()
+        dbfs, clipped = frame_levels(bytes(self._batch[:usable]), self.frame_bytes)
+        del self._batch[:usable]
+        self.last_levels = dbfs
+
+        frames = len(dbfs)
+        silent = dbfs < SILENCE_DBFS
+        silent_frames = int(silent.sum())
+        clipped_samples = int(clipped.sum())
+        self.frames += frames
+        self.silent_frames += silent_frames
+        self.clipped_samples += clipped_samples
+        self.peak_dbfs = max(self.peak_dbfs, float(dbfs.max()))
+        if silent_frames < frames:
+            speech = dbfs[~silent]
+            self.speech_frames += len(speech)
+            self.speech_dbfs_sum += float(speech.sum())
+
+        # Length of the silence that runs up to the end of this window
+        if silent_frames == frames:
+            self.silence_run_ms += frames * self.frame_ms
+        else:
+            last_speech = frames - 1 - int(np.flatnonzero(~silent)[-1])
+            self.silence_run_ms = last_speech * self.frame_ms
+        self.longest_silence_ms = max(self.longest_silence_ms, self.silence_run_ms)
+
+        events = []
+        if self.silence_run_ms >= DEAD_AIR_MS:
+            self._event(events, "dead_air", self.silence_run_ms)
+        if clipped_samples > CLIPPING_RATIO * frames * self.frame_bytes:
+            self._event(events, "clipping", clipped_samples)
+        if self.speech_frames * self.frame_ms >= LOW_LEVEL_MIN_MS:
+            speech_dbfs = self.speech_dbfs_sum / self.speech_frames
+            if speech_dbfs < LOW_LEVEL_DBFS:
+                self._event(events, "low_level", round(speech_dbfs, 1))
+        return events
+
+    def _event(self, events, kind, detail):
+        last = self._last_event_ms.get(kind)
+        if last is not None and self.elapsed_ms - last < EVENT_COOLDOWN_MS:
+            return
+        self._last_event_ms[kind] = self.elapsed_ms
+        self.events[kind] = self.events.get(kind, 0) + 1
+        events.append((kind, detail))
+
+    def summary(self):
+        if not self.frames:
+            return {}
+        summary = {
+            "seconds": round(self.elapsed_ms / 1000, 1),
+            "silence_ratio": round(self.silent_frames / self.frames, 3),
+            "clipped_samples": self.clipped_samples,
+            "peak_dbfs": round(self.peak_dbfs, 1),
+            "longest_silence_ms": self.longest_silence_ms,
+        }
+        if self.speech_frames:
+            summary["speech_dbfs"] = round(
+                self.speech_dbfs_sum / self.speech_frames, 1
+            )
+        summary.update(self.events)
+        return summary
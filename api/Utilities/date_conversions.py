@@ -1,6 +1,111 @@
-from datetime import datetime
+from array import array
+from bisect import bisect_left
+from calendar import day_name
+from datetime import date, timedelta
+from functools import lru_cache
 import random
 
+EPOCH = date(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+SLOT_MINUTES = 60  # An appointment blocks the hour it starts in
+FORMAT_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def parse_time(time_str):
+    """
+    Converts "14:00" or "2:00 PM" to minutes after midnight.
+    """
+    time_str = time_str.strip().upper()
+    suffix = None
+    if time_str.endswith(("AM", "PM")):
+        suffix = time_str[-2:]
+        time_str = time_str[:-2].strip()
+    hours, minutes = time_str.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if suffix:
+        hours = hours % 12 + (12 if suffix == "PM" else 0)
+    return hours * 60 + minutes
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def slot_minute(date_str, time_str):
+    """
+    Converts an ISO date and a time to a minute-of-epoch integer.
+    """
+    days = (date.fromisoformat(date_str) - EPOCH).days
+    return days * MINUTES_PER_DAY + parse_time(time_str)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_slot(minute):
+    """
+    Converts a minute-of-epoch back to (ISO date, day name, 12-hour time).
+    """
+    days, minute_of_day = divmod(minute, MINUTES_PER_DAY)
+    slot_date = EPOCH + timedelta(days=days)
+    hours, minutes = divmod(minute_of_day, 60)
+    suffix = "PM" if hours >= 12 else "AM"
+    return (
+        slot_date.isoformat(),
+        day_name[slot_date.weekday()],
+        f"{hours % 12 or 12}:{minutes:02d} {suffix}",
+    )
+
+
+@lru_cache(maxsize=1024)
+def _slot_array(availability_key):
+    minutes = {
+        slot_minute(entry_date, slot)
+        for entry_date, slots in availability_key
+        for slot in slots
+    }
+    return array("q", sorted(minutes))
+
+
+def availability_minutes(availability):
+    """
+    Parses an availability list once into a sorted array of minute-of-epoch slots.
+    Identical availability (e.g. the same company on many calls) is parsed once.
+    """
+    availability_key = tuple(
+        (entry["date"], tuple(entry["slots"])) for entry in availability
+    )
+    return _slot_array(availability_key)
+
+
+def subtract_booked(slot_minutes, booked_minutes, slot_length=SLOT_MINUTES):
+    """
+    Removes slots that overlap a booked appointment.
+    Bookings are kept sorted, so each slot is checked with one bisect.
+    """
+    booked = sorted(booked_minutes)
+    if not booked:
+        return slot_minutes
+    free = array("q")
+    for minute in slot_minutes:
+        # Nearest booking starting after (minute - slot_length) must not start
+        # before this slot ends
+        i = bisect_left(booked, minute - slot_length + 1)
+        if i < len(booked) and booked[i] < minute + slot_length:
+            continue
+        free.append(minute)
+    return free
+
+
+def booked_minutes(appointments):
+    """
+    Converts stored appointments (date + time) to minute-of-epoch starts.
+    Appointments without a parseable date and time are ignored.
+    """
+    minutes = []
+    for appointment in appointments:
+        try:
+            minutes.append(slot_minute(appointment["date"], appointment["time"]))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    return minutes
+
 
 def format_availability(availability):
     """
@@ -10,28 +115,45 @@ def format_availability(availability):
     formatted_availability = []
 
     for entry in availability:
-        # Convert date to day of the week
-        date_obj = datetime.strptime(entry["date"], "%Y-%m-%d")
-        day_name = date_obj.strftime("%A")
-
-        # Convert times to 12-hour AM/PM format
         formatted_times = [
-            datetime.strptime(time, "%H:%M")
-            .strftime("%I:%M %p")
-            .lstrip("0")  # Remove leading zero
-            for time in entry["slots"]
+            format_slot(slot_minute(entry["date"], time))[2] for time in entry["slots"]
         ]
-
         formatted_availability.append(
             {
                 "date": entry["date"],
-                "day": day_name,
+                "day": format_slot(slot_minute(entry["date"], "00:00"))[1],
                 "slots": formatted_times,
             }
         )
     return formatted_availability
 
 
+def _slots_from_minutes(free_minutes):
+    if not free_minutes:
+        return "No available appointments.", [], "No available appointments."
+
+    # Soonest slot is the first element of the sorted array
+    soonest_date, soonest_day, soonest_time = format_slot(free_minutes[0])
+    soonest_available = f"{soonest_day} at {soonest_time}"
+
+    rest_available = []
+    for minute in free_minutes[1:]:
+        slot_date, slot_day, slot_time = format_slot(minute)
+        if not rest_available or rest_available[-1]["date"] != slot_date:
+            rest_available.append({"date": slot_date, "day": slot_day, "slots": []})
+        rest_available[-1]["slots"].append(slot_time)
+
+    # If no remaining slots, fallback to soonest_available
+    if not rest_available:
+        return soonest_available, rest_available, soonest_available
+
+    # Suggest a random remaining slot, spreading concurrent calls across the week
+    _, random_day, random_time = format_slot(random.choice(free_minutes[1:]))
+    random_slot = [random_day, random_time]
+
+    return soonest_available, rest_available, random_slot
+
+
 def get_appointment_slots(formatted_availability):
     """
     - Identify the soonest available slot
@@ -41,50 +163,26 @@ def get_appointment_slots(formatted_availability):
     if not formatted_availability:
         raise ValueError("No available appointment slots.")
 
-    # Find the soonest available slot
-    first_entry = formatted_availability[0]
-    first_date = first_entry["date"]
-    first_day = first_entry["day"]
-    first_time = first_entry["slots"][0] if first_entry["slots"] else None
-
-    if first_time is None:
-        for entry in formatted_availability[1:]:  # Check other days
-            if entry["slots"]:
-                first_date = entry["date"]
-                first_day = entry["day"]
-                first_time = entry["slots"][0]
-                break
-
-    if first_time is None:
-        return "No available appointments.", [], "No available appointments."
+    return _slots_from_minutes(availability_minutes(formatted_availability))
 
-    soonest_available = f"{first_day} at {first_time}"
-
-    # Remove the soonest slot from rest_available
-    rest_available = [
-        {
-            "date": entry["date"],
-            "day": entry["day"],
-            "slots": (
-                entry["slots"][1:] if entry["date"] == first_date else entry["slots"]
-            ),
-        }
-        for entry in formatted_availability
-        if entry["slots"][1:] or entry["date"] != first_date  # Keep only non-empty days
-    ]
 
-    # If no remaining slots, fallback to soonest_available
-    if not rest_available:
-        return soonest_available, rest_available, soonest_available
-
-    # Choose a random slot from remaining availability
-    random_entry = random.choice(rest_available)
-    random_day = random_entry["day"]
-    random_date = random_entry["date"]
-    random_time = random.choice(random_entry["slots"])
-    random_slot = [random_day, random_time]
-
-    return soonest_available, rest_available, random_slot
+def remove_booked_slots(availability, booked):
+    """
+    Returns the availability list (same shape) without the slots that overlap
+    a `booked` appointment (dicts with date and time). Days left with no
+    free slot are dropped.
+    """
+    free = set(
+        subtract_booked(availability_minutes(availability), booked_minutes(booked))
+    )
+    free_availability = []
+    for entry in availability:
+        slots = [
+            slot for slot in entry["slots"] if slot_minute(entry["date"], slot) in free
+        ]
+        if slots:
+            free_availability.append({**entry, "slots": slots})
+    return free_availability
 
 
 # availability_data = {
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from api.config import logger
+
+LEVEL_REFRESH_INTERVAL = 1.0  # Seconds between log level re-checks
+SAMPLE_EVERY_N = 250  # Log one frame in N when debug is on (5 s of 20 ms frames)
+SUMMARY_INTERVAL = 1.0  # Seconds between per-call summary lines
+
+
+class HotPathLevel:
+    """
+    Cached log level checks for the audio hot path.
+    `debug` is a plain attribute refreshed in the background, so a per-frame
+    check costs one attribute lookup and no f-string is built when it is off.
+    """
+
+    def __init__(self, target_logger):
+        self.logger = target_logger
+        self.debug = False
+        self._task = None
+        self.refresh()
+
+    def refresh(self):
+        self.debug = self.logger.isEnabledFor(logging.DEBUG)
+
+    def start(self):
+        """Starts re-checking the level periodically (picks up runtime changes)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LEVEL_REFRESH_INTERVAL)
+            self.refresh()
+
+
+hot_path = HotPathLevel(logger)
+
+
+class FrameSampler:
+    """
+    Per-call, per-direction frame counters.
+    With debug on, logs one frame in `every_n` plus one summary line per
+    `interval`; with debug off it only counts.
+    """
+
+    def __init__(self, name, every_n=SAMPLE_EVERY_N, interval=SUMMARY_INTERVAL):
+        self.name = name
+        self.every_n = every_n
+        self.interval = interval
+        self.frames = 0
+        self.bytes = 0
+        self._window_frames = 0
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+
+    def frame(self, size):
+        self.frames += 1
+        self.bytes += size
+        if not hot_path.debug:
+            return
+
+        self._window_frames += 1
+        self._window_bytes += size
+        if self.frames % self.every_n == 0:
+            logger.debug("%s: frame %d, %d bytes", self.name, self.frames, size)
+
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.interval:
+            logger.debug(
+                "%s: %d frames, %d bytes in %.1fs (total %d frames)",
+                self.name,
+                self._window_frames,
+                self._window_bytes,
+                elapsed,
+                self.frames,
+            )
+            self._window_frames = 0
+            self._window_bytes = 0
+            self._window_start = now
+
+
+def install_queue_logging(target_logger=logger):
+    """
+    Moves the logger's handlers (and the root logger's) behind queues, so the
+    event loop only enqueues records and listener threads do the disk I/O.
+    Returns the started QueueListeners; stop them at shutdown.
+    """
+    listeners = []
+    for log in (target_logger, logging.getLogger()):
+        handlers = [h for h in log.handlers if not isinstance(h, QueueHandler)]
+        if not handlers:
+            continue
+        log_queue = queue.SimpleQueue()
+        for handler in handlers:
+            log.removeHandler(handler)
+        log.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        listeners.append(listener)
+
+    hot_path.refresh()
+    return listeners
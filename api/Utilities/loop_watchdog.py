@@ -0,0 +1,143 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from api.config import logger
+from api.Utilities.metrics import LOOP_LAG, LOOP_STALLS
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))  # Seconds
+# Blocking longer than this is logged with the stack that was running
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", "0.1"))
+# New calls are refused while lag stays above this; 0 disables shedding
+LOOP_LAG_SHED_LIMIT = float(os.getenv("LOOP_LAG_SHED_LIMIT", "0.25"))
+SHED_HOLD_SECONDS = 5.0  # Keep shedding this long after the last slow sample
+STACK_LIMIT = 12  # Innermost frames kept in a stall report
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _culprit(stack):
+    """
+    Names the innermost frame in this app's code, e.g.
+    "api/Tools/tools.py:67 write_call_summary", or the innermost frame if the
+    loop was blocked outside it.
+    """
+    for frame in reversed(stack):
+        if frame.filename.startswith(_APP_ROOT):
+            path = os.path.relpath(frame.filename, os.path.dirname(_APP_ROOT))
+            return f"{path}:{frame.lineno} {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+    return "unknown"
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag and catches whatever is blocking the loop.
+
+    A task on the loop sleeps for `interval` and records how late it woke up.
+    A monitor thread watches that heartbeat; when it goes stale for longer
+    than `stall_threshold` the thread grabs the loop thread's stack while
+    the blocking code is still running. The stall is logged (and counted by
+    code location) once the loop gets going again. While lag is above
+    `shed_limit`, `overloaded` is True so new calls can be turned away.
+    """
+
+    def __init__(
+        self,
+        interval=LOOP_LAG_INTERVAL,
+        stall_threshold=LOOP_STALL_THRESHOLD,
+        shed_limit=LOOP_LAG_SHED_LIMIT,
+    ):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.shed_limit = shed_limit
+        self.last_lag = 0.0
+        self._heartbeat = time.perf_counter()
+        self._shed_until = 0.0
+        self._stall_stack = None  # Set by the monitor thread
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def overloaded(self):
+        return bool(self.shed_limit) and time.perf_counter() < self._shed_until
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(
+            target=self._monitor, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _sample(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._heartbeat = now
+            lag = max(0.0, now - started - self.interval)
+            self.last_lag = lag
+            LOOP_LAG.observe(lag)
+
+            if self.shed_limit and lag > self.shed_limit:
+                if not self.overloaded:
+                    logger.warning(
+                        f"Event loop lag {lag * 1000:.0f} ms. Shedding new calls."
+                    )
+                self._shed_until = now + SHED_HOLD_SECONDS
+            if lag > self.stall_threshold:
+                self._report_stall(lag)
+            else:
+                # Caught on the way out of a short stall; don't blame the next one
+                self._stall_stack = None
+
+    def _report_stall(self, lag):
+        stack, self._stall_stack = self._stall_stack, None
+        if stack is None:
+            # Blocked in C code holding the GIL, so the monitor never ran
+            LOOP_STALLS.labels("unknown").inc()
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms.")
+            return
+        culprit = _culprit(stack)
+        LOOP_STALLS.labels(culprit).inc()
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f} ms in {culprit}\n"
+            + "".join(traceback.format_list(stack[-STACK_LIMIT:]))
+        )
+
+    def _monitor(self):
+        poll = min(self.interval, self.stall_threshold) / 2
+        while not self._stopping.wait(poll):
+            overdue = time.perf_counter() - self._heartbeat - self.interval
+            if overdue < self.stall_threshold or self._stall_stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stall_stack = traceback.extract_stack(frame)
+
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,288 @@
+import time
+from bisect import bisect_left
+
+# Seconds; covers sub-frame event handling up to multi-second model turns
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2, 3, 5, 10)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+LEVEL_DBFS_BUCKETS = (-60, -50, -45, -40, -35, -30, -25, -20, -15, -10, -5, 0)
+CALL_DURATION_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # One bisect and two additions; cumulative counts are built when scraped
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """
+    Base for metrics. Values are updated from the event loop thread only,
+    so there are no locks on the hot path.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        """Returns the child for these label values. Keep it to skip the lookup."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in self._children.items():
+            labels = tuple(zip(self.labelnames, values))
+            for suffix, sample_labels, value in self._samples(child, labels):
+                lines.append(
+                    f"{self.name}{suffix}{_format_labels(sample_labels)} {value}"
+                )
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+    def _samples(self, child, labels):
+        yield "", labels, child.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1):
+        self._default.value -= amount
+
+    def set(self, value):
+        self._default.value = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, **kwargs
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _samples(self, child, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), child.counts):
+            cumulative += count
+            yield "_bucket", labels + (("le", bound),), cumulative
+        yield "_sum", labels, child.sum
+        yield "_count", labels, child.count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class CallMetrics:
+    """
+    Per-call view of the latency histograms. Observations go to the global
+    histogram and are kept for the call, so a one-line summary can be logged
+    when the call ends and degraded calls can be found by call_id.
+    """
+
+    def __init__(self, call_id):
+        self.call_id = call_id
+        self.started_at = time.perf_counter()
+        self.values = {}
+        self.counts = {}
+
+    def observe(self, histogram, value):
+        histogram.observe(value)
+        self.values.setdefault(histogram.name, []).append(value)
+
+    def count(self, name, counter, amount=1):
+        counter.inc(amount)
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def summary(self):
+        summary = {"call_id": self.call_id}
+        for name, values in self.values.items():
+            short_name = name.removeprefix("voiceagent_").removesuffix("_seconds")
+            ordered = sorted(values)
+            summary[f"{short_name}_ms"] = {
+                "n": len(values),
+                "p50": round(ordered[len(ordered) // 2] * 1000),
+                "max": round(ordered[-1] * 1000),
+            }
+        summary.update(self.counts)
+        return summary
+
+
+# Call lifecycle
+CALLS_ACTIVE = Gauge("voiceagent_calls_active", "Calls currently streaming audio.")
+CALLS_TOTAL = Counter("voiceagent_calls_total", "Calls that started streaming audio.")
+CALL_DURATION = Histogram(
+    "voiceagent_call_duration_seconds",
+    "Duration of the audio stream per call.",
+    buckets=CALL_DURATION_BUCKETS,
+)
+STREAM_ERRORS = Counter(
+    "voiceagent_stream_errors_total",
+    "Audio stream loops that ended with an error.",
+    ["stream"],
+)
+CALLS_ADMITTED = Gauge(
+    "voiceagent_calls_admitted",
+    "Calls holding a capacity slot, from dialing to their final status.",
+)
+ADMISSION_WAITING = Gauge(
+    "voiceagent_admission_waiting",
+    "New calls waiting for a capacity slot.",
+)
+CALLS_REJECTED = Counter(
+    "voiceagent_calls_rejected_total",
+    "New calls refused to protect calls in progress.",
+    ["reason"],
+)
+
+# Latencies
+OPENAI_READY = Histogram(
+    "voiceagent_openai_ready_seconds",
+    "Twilio websocket accepted to OpenAI session ready.",
+)
+SESSION_UPDATE = Histogram(
+    "voiceagent_session_update_seconds",
+    "session.update sent to session.updated received.",
+)
+FIRST_AUDIO = Histogram(
+    "voiceagent_first_audio_seconds",
+    "Audio stream start to the first AI audio delta.",
+)
+TURN_LATENCY = Histogram(
+    "voiceagent_turn_latency_seconds",
+    "End of user speech to the first AI audio delta of the reply.",
+)
+INTERRUPTION_CLEAR = Histogram(
+    "voiceagent_interruption_clear_seconds",
+    "User speech started to Twilio playback cleared.",
+)
+TOOL_DURATION = Histogram(
+    "voiceagent_tool_duration_seconds",
+    "Time to run a tool call, including ones that time out or fail.",
+    ["tool"],
+)
+TOOL_ERRORS = Counter(
+    "voiceagent_tool_errors_total",
+    "Tool calls that timed out or raised.",
+    ["tool", "reason"],
+)
+
+# Audio
+FRAMES_DROPPED = Counter(
+    "voiceagent_audio_frames_dropped_total",
+    "Audio frames dropped because the receiving websocket was closed.",
+    ["direction"],
+)
+INBOUND_FRAMES_DROPPED = FRAMES_DROPPED.labels("inbound")
+OUTBOUND_FRAMES_DROPPED = FRAMES_DROPPED.labels("outbound")
+LINE_EVENTS = Counter(
+    "voiceagent_line_events_total",
+    "Caller line problems: dead_air, clipping, low_level, speech_too_quiet.",
+    ["event"],
+)
+LINE_SPEECH_LEVEL = Histogram(
+    "voiceagent_line_speech_level_dbfs",
+    "Average caller speech level per call.",
+    buckets=LEVEL_DBFS_BUCKETS,
+)
+INBOUND_FRAMES_SUPPRESSED = Counter(
+    "voiceagent_inbound_frames_suppressed_total",
+    "Silent caller frames the local VAD kept from OpenAI.",
+)
+LOCAL_BARGE_INS = Counter(
+    "voiceagent_local_barge_ins_total",
+    "AI responses interrupted by the local VAD before OpenAI's speech_started.",
+)
+OUTBOUND_AUDIO_DROPPED = Counter(
+    "voiceagent_outbound_audio_dropped_seconds_total",
+    "AI audio discarded by the outbound pacer instead of being played late.",
+    ["reason"],
+)
+
+# Event loop
+LOOP_LAG = Histogram(
+    "voiceagent_event_loop_lag_seconds",
+    "How late the event loop ran a timer it was asked to run.",
+    buckets=LOOP_LAG_BUCKETS,
+)
+LOOP_STALLS = Counter(
+    "voiceagent_event_loop_stalls_total",
+    "Times the event loop was blocked past the stall threshold, by code location.",
+    ["where"],
+)
@@ -1,12 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from config import logger
 from api.Routers import router as api_router
+from api.Logic.AI.connection_pool import openai_pool
+from api.Logic.PostCall.worker import post_call_worker, POST_CALL_INPROCESS_WORKER
+from api.Logic.Recording.recorder import recording_writer, RECORDINGS_ENABLED
+from api.Logic.State.call_store import call_store
+from api.Logic.State.worker_inbox import worker_inbox, WEB_CONCURRENCY
+from api.Logic.Telephony.dialer import campaign_dialer
+from api.Logic.Telephony.twilio_client import twilio_rest
+from api.Tools.appointment_store import appointment_store
+from api.Utilities.hot_logging import hot_path, install_queue_logging
+from api.Utilities.loop_watchdog import loop_watchdog
+from api.Utilities.metrics import REGISTRY
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WEB_CONCURRENCY > 1 and not call_store.shared:
+        raise RuntimeError(
+            "Multiple workers need a shared CALL_STORE_URL (sqlite:/// or redis://)."
+        )
+    # Keep log formatting and disk I/O off the event loop
+    log_listeners = install_queue_logging()
+    hot_path.start()
+    # Find whatever blocks the event loop before callers hear it
+    loop_watchdog.start()
+    # Pre-warm OpenAI Realtime sessions before the first call comes in
+    await openai_pool.start()
+    call_store.start()
+    # Webhooks can land on any worker; state owned by this one arrives here
+    worker_inbox.start()
+    # One pooled Twilio REST client for every dial
+    twilio_rest.start()
+    if POST_CALL_INPROCESS_WORKER:
+        post_call_worker.start()
+    if RECORDINGS_ENABLED:
+        recording_writer.start()
+    yield
+    await campaign_dialer.stop()
+    await worker_inbox.stop()
+    await post_call_worker.stop()
+    # Finishes files for calls still buffered
+    await asyncio.to_thread(recording_writer.stop)
+    await twilio_rest.stop()
+    await openai_pool.stop()
+    await call_store.close()
+    # Keep the legacy appointments.json in step with the append-only log;
+    # safe with several workers, the store locks and skips repeat exports
+    await appointment_store.export_json()
+    await hot_path.stop()
+    await loop_watchdog.stop()
+    for listener in log_listeners:
+        listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(api_router)
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    logger.info("Starting server...")
-    uvicorn.run(app, host="0.0.0.0", port=8855)
+    logger.info(f"Starting server with {WEB_CONCURRENCY} worker(s)...")
+    # One process per core; workers share state through CALL_STORE_URL
+    uvicorn.run("api.main:app", host="0.0.0.0", port=8855, workers=WEB_CONCURRENCY)
@@ -0,0 +1,64 @@
+import time
+
+FRAME_MS = 20
+FRAME_BYTES = 160  # 20 ms of 8 kHz g711 ulaw
+# time.monotonic_ns() in the first 16 bytes of a frame, one nibble per byte.
+# 0xF0-0xFF are the quietest ulaw codes, so stamps don't make silence loud.
+STAMP_BYTES = 16
+STAMP_CODE = 0xF0
+ULAW_SILENCE = 0xFF
+
+
+def stamp(frame):
+    """
+    Overwrites the start of an audio frame with the current monotonic time.
+    CLOCK_MONOTONIC is system-wide on Linux, so stamps can be read by another
+    process on the same host.
+    """
+    now_ns = time.monotonic_ns()
+    nibbles = bytes(
+        STAMP_CODE | (now_ns >> shift) & 0x0F
+        for shift in range(4 * (STAMP_BYTES - 1), -1, -4)
+    )
+    return nibbles + frame[STAMP_BYTES:]
+
+
+def read_stamp(frame):
+    """Returns the age in seconds of a stamped frame, or None if it isn't stamped."""
+    if len(frame) < STAMP_BYTES:
+        return None
+    sent_ns = 0
+    for byte in frame[:STAMP_BYTES]:
+        sent_ns = sent_ns << 4 | byte & 0x0F
+    age_ns = time.monotonic_ns() - sent_ns
+    # Unstamped audio decodes to absurd values; ignore anything over a minute
+    if not 0 <= age_ns < 60_000_000_000:
+        return None
+    return age_ns / 1e9
+
+
+def load_ulaw_frames(path=None, seconds=10):
+    """
+    Splits a raw 8 kHz ulaw recording into 20 ms frames. Without a recording,
+    returns low-level noise so the frames aren't all identical.
+    """
+    if path:
+        with open(path, "rb") as f:
+            audio = f.read()
+    else:
+        audio = bytes(0xF0 + (i * 7919) % 16 for i in range(8000 * seconds))
+    usable = len(audio) - len(audio) % FRAME_BYTES
+    return [audio[i : i + FRAME_BYTES] for i in range(0, usable, FRAME_BYTES)]
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Summarizes latencies in seconds as {"n", "p50", "p90", "p99", "max"} in ms."""
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    result = {"n": len(ordered)}
+    for point in points:
+        index = min(len(ordered) - 1, int(len(ordered) * point / 100))
+        result[f"p{point}"] = round(ordered[index] * 1000, 2)
+    result["max"] = round(ordered[-1] * 1000, 2)
+    return result
@@ -0,0 +1,158 @@
+import asyncio
+import base64
+import json
+import uuid
+import websockets
+from bench.common import FRAME_BYTES, ULAW_SILENCE, read_stamp, stamp
+
+TURN_EVERY_MS = 4000  # Inbound audio between scripted AI turns
+RESPONSE_MS = 2000  # Length of each scripted AI answer
+DELTA_MS = 100  # Audio per response.audio.delta
+DELTA_INTERVAL = 0.05  # The real API streams faster than real time
+INTERRUPT_EVERY = 3  # Every Nth answer is cut off by speech_started
+TOOL_EVERY = 2  # Every Nth response.done carries a function_call
+
+
+class FakeRealtimeSession:
+    """
+    Scripted stand-in for one OpenAI Realtime session. Every TURN_EVERY_MS of
+    appended audio it ends the user's turn and streams an answer as
+    response.audio.delta events; some answers are interrupted with
+    speech_started and some responses end in a function_call.
+    """
+
+    def __init__(self, ws, stats):
+        self.ws = ws
+        self.stats = stats
+        self.received_ms = 0
+        self.turns = 0
+        self.responding = None
+
+    async def send(self, event):
+        await self.ws.send(json.dumps(event))
+
+    async def run(self):
+        try:
+            async for message in self.ws:
+                await self.handle(json.loads(message))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.responding:
+                self.responding.cancel()
+
+    async def handle(self, event):
+        event_type = event.get("type")
+        if event_type == "input_audio_buffer.append":
+            self.stats["appends"] += 1
+            frame = base64.b64decode(event["audio"])
+            age = read_stamp(frame)
+            if age is not None:
+                self.stats["inbound"].append(age)
+            self.received_ms += len(frame) // 8
+            if self.received_ms >= TURN_EVERY_MS * (self.turns + 1):
+                self.turns += 1
+                if self.responding is None or self.responding.done():
+                    self.responding = asyncio.create_task(self.respond(self.turns))
+        elif event_type == "session.update":
+            await self.send(
+                {
+                    "type": "session.updated",
+                    "event_id": f"event_{uuid.uuid4().hex}",
+                    "session": event.get("session", {}),
+                }
+            )
+        elif event_type == "conversation.item.truncate":
+            await self.send(
+                {
+                    "type": "conversation.item.truncated",
+                    "item_id": event.get("item_id"),
+                    "content_index": 0,
+                    "audio_end_ms": event.get("audio_end_ms"),
+                }
+            )
+
+    async def respond(self, turn):
+        await self.send({"type": "input_audio_buffer.speech_stopped"})
+        item_id = f"item_{uuid.uuid4().hex[:12]}"
+        delta_bytes = DELTA_MS * 8
+        frames_per_delta = delta_bytes // FRAME_BYTES
+        interrupt_at = RESPONSE_MS // 4 if turn % INTERRUPT_EVERY == 0 else None
+
+        sent_ms = 0
+        while sent_ms < RESPONSE_MS:
+            if interrupt_at is not None and sent_ms >= interrupt_at:
+                await self.send({"type": "input_audio_buffer.speech_started"})
+                self.stats["interruptions"] += 1
+                return
+            # Each 20 ms frame carries its send time for latency measurement
+            audio = b"".join(
+                stamp(bytes([ULAW_SILENCE]) * FRAME_BYTES)
+                for _ in range(frames_per_delta)
+            )
+            await self.send(
+                {
+                    "type": "response.audio.delta",
+                    "item_id": item_id,
+                    "delta": base64.b64encode(audio).decode("ascii"),
+                }
+            )
+            sent_ms += DELTA_MS
+            await asyncio.sleep(DELTA_INTERVAL)
+
+        output = [{"type": "message", "id": item_id}]
+        if turn % TOOL_EVERY == 0:
+            # A post-call-only tool, so the app answers it without side effects
+            output.append(
+                {
+                    "type": "function_call",
+                    "name": "scheduled_appointment",
+                    "call_id": f"call_{uuid.uuid4().hex[:12]}",
+                    "arguments": json.dumps({"date": None, "time": None}),
+                }
+            )
+            self.stats["tool_calls"] += 1
+        await self.send(
+            {
+                "type": "response.done",
+                "response": {"status": "completed", "output": output},
+            }
+        )
+        self.stats["responses"] += 1
+
+
+class FakeRealtimeServer:
+    """Local websocket server speaking enough of the Realtime API for load tests."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.stats = {
+            "inbound": [],
+            "appends": 0,
+            "sessions": 0,
+            "responses": 0,
+            "interruptions": 0,
+            "tool_calls": 0,
+        }
+        self._server = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v1/realtime"
+
+    async def _handler(self, ws):
+        self.stats["sessions"] += 1
+        await FakeRealtimeSession(ws, self.stats).run()
+
+    async def start(self):
+        self._server = await websockets.serve(
+            self._handler, self.host, self.port, max_size=None
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import json
+import time
+import uuid
+import websockets
+from bench.common import FRAME_MS, read_stamp, stamp
+
+
+class FakeTwilioCall:
+    """
+    Plays the Twilio side of a media stream: sends `start`, then recorded ulaw
+    frames at real-time pace (20 ms apart, on a fixed clock so slow sends
+    don't drift), then `stop`. Media sent back by the app is "played" on a
+    playout clock, and marks are echoed once the audio before them has played,
+    as Twilio does. `clear` drops whatever hasn't played yet.
+    """
+
+    def __init__(self, url, frames, duration, stats):
+        self.url = url
+        self.frames = frames
+        self.duration = duration
+        self.stats = stats
+        self.stream_sid = f"MZ{uuid.uuid4().hex}"
+        self._playout_end = 0.0
+        self._pending_marks = []  # (plays_at, name)
+
+    async def run(self):
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    await self._send(ws)
+                finally:
+                    receiver.cancel()
+            self.stats["completed"] += 1
+        except Exception as e:
+            self.stats["errors"].append(repr(e))
+
+    async def _send(self, ws):
+        await ws.send(
+            json.dumps(
+                {
+                    "event": "start",
+                    "start": {"streamSid": self.stream_sid},
+                    "streamSid": self.stream_sid,
+                }
+            )
+        )
+        frame_count = int(self.duration * 1000 / FRAME_MS)
+        started = time.monotonic()
+        for i in range(frame_count):
+            frame = stamp(self.frames[i % len(self.frames)])
+            await ws.send(
+                json.dumps(
+                    {
+                        "event": "media",
+                        "streamSid": self.stream_sid,
+                        "media": {
+                            "timestamp": str(i * FRAME_MS),
+                            "payload": base64.b64encode(frame).decode("ascii"),
+                        },
+                    },
+                    separators=(",", ":"),
+                )
+            )
+            self.stats["frames_sent"] += 1
+            await self._echo_marks(ws)
+            next_at = started + (i + 1) * FRAME_MS / 1000
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        await ws.send(json.dumps({"event": "stop", "streamSid": self.stream_sid}))
+
+    async def _echo_marks(self, ws):
+        now = time.monotonic()
+        while self._pending_marks and self._pending_marks[0][0] <= now:
+            _, name = self._pending_marks.pop(0)
+            await ws.send(
+                json.dumps(
+                    {
+                        "event": "mark",
+                        "streamSid": self.stream_sid,
+                        "mark": {"name": name},
+                    }
+                )
+            )
+
+    async def _receive(self, ws):
+        async for message in ws:
+            event = json.loads(message)
+            kind = event.get("event")
+            if kind == "media":
+                audio = base64.b64decode(event["media"]["payload"])
+                age = read_stamp(audio)
+                if age is not None:
+                    self.stats["outbound"].append(age)
+                self.stats["frames_received"] += 1
+                now = time.monotonic()
+                self._playout_end = max(self._playout_end, now) + len(audio) / 8000
+            elif kind == "mark":
+                self._pending_marks.append(
+                    (max(self._playout_end, time.monotonic()), event["mark"]["name"])
+                )
+            elif kind == "clear":
+                self.stats["clears"] += 1
+                self._playout_end = time.monotonic()
+                # Marks after a clear are returned immediately by Twilio
+                self._pending_marks = [
+                    (0.0, name) for _, name in self._pending_marks
+                ]
@@ -0,0 +1,261 @@
+"""
+Load test: N simultaneous calls through the real app against local fakes.
+
+    python -m bench.load_test --calls 50 --duration 30
+
+To compare inbound coalescing, run twice on the same recording:
+
+    python -m bench.load_test --audio call.ulaw --coalesce 0
+    python -m bench.load_test --audio call.ulaw --coalesce 60
+
+The app (FastAPI under uvicorn) runs in this process, so CPU, memory and
+event-loop lag are the app's own. The fake OpenAI Realtime server and the
+fake Twilio media clients run in a child process. Audio frames carry their
+send time, so forwarding latency is measured in both directions across the
+two processes. Twilio REST uses the fake transport.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from bench.common import load_ulaw_frames, percentiles
+
+LAG_INTERVAL = 0.01  # Event-loop lag sampling period
+SAMPLE_CALL = os.path.join(os.path.dirname(__file__), "..", "sample.json")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak, not current, but the best available off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- Child process: fake OpenAI server and fake Twilio callers ---
+
+
+def _post(url, body, form=False):
+    if form:
+        data = urllib.parse.urlencode(body).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    else:
+        data = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+    request = urllib.request.Request(url, data=data, headers=headers, method="POST")
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read() or b"null")
+
+
+async def _drive(conn, args):
+    from bench.fake_realtime import FakeRealtimeServer
+    from bench.fake_twilio import FakeTwilioCall
+
+    server = await FakeRealtimeServer().start()
+    conn.send(server.url)
+    app_port = await asyncio.to_thread(conn.recv)
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    with open(args.call_request) as f:
+        call_request = json.load(f)
+    frames = load_ulaw_frames(args.audio)
+    stats = {
+        "outbound": [],
+        "frames_sent": 0,
+        "frames_received": 0,
+        "clears": 0,
+        "completed": 0,
+        "errors": [],
+    }
+
+    async def one_call(delay):
+        await asyncio.sleep(delay)
+        call = await asyncio.to_thread(_post, f"{base_url}/call", call_request)
+        await FakeTwilioCall(
+            f"ws://127.0.0.1:{app_port}/call-stream/{call['call_id']}",
+            frames,
+            args.duration,
+            stats,
+        ).run()
+        await asyncio.to_thread(
+            _post,
+            f"{base_url}/twilio/call-completed",
+            {"CallSid": call["twilio_call_sid"], "CallStatus": "completed"},
+            True,
+        )
+
+    ramp = args.ramp / max(1, args.calls)
+    await asyncio.gather(
+        *(one_call(i * ramp) for i in range(args.calls)), return_exceptions=True
+    )
+    await server.stop()
+    conn.send(
+        {
+            "inbound_ms": percentiles(server.stats["inbound"]),
+            "outbound_ms": percentiles(stats["outbound"]),
+            "sessions": server.stats["sessions"],
+            "responses": server.stats["responses"],
+            "interruptions": server.stats["interruptions"],
+            "tool_calls": server.stats["tool_calls"],
+            "inbound_appends": server.stats["appends"],
+            "frames_sent": stats["frames_sent"],
+            "frames_received": stats["frames_received"],
+            "clears": stats["clears"],
+            "calls_completed": stats["completed"],
+            "errors": stats["errors"][:10],
+        }
+    )
+
+
+def _driver_main(conn, args):
+    asyncio.run(_drive(conn, args))
+
+
+# --- Parent process: the app under test ---
+
+
+async def _sample_loop_lag(samples):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+
+async def _run_app(args, conn, app):
+    import uvicorn
+    from api.Utilities.metrics import REGISTRY
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    lag = []
+    lag_task = asyncio.create_task(_sample_loop_lag(lag))
+    rss_before = _rss_bytes()
+    rss_peak = rss_before
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+
+    conn.send(port)
+    result = asyncio.create_task(asyncio.to_thread(conn.recv))
+    while not result.done():
+        rss_peak = max(rss_peak, _rss_bytes())
+        await asyncio.sleep(0.5)
+    driver_stats = result.result()
+
+    cpu = time.process_time() - cpu_before
+    wall = time.perf_counter() - wall_before
+    lag_task.cancel()
+    server.should_exit = True
+    await serving
+
+    app_latency = {}
+    for name in (
+        "voiceagent_openai_ready_seconds",
+        "voiceagent_first_audio_seconds",
+        "voiceagent_turn_latency_seconds",
+        "voiceagent_interruption_clear_seconds",
+    ):
+        histogram = REGISTRY._metrics[name]._default
+        if histogram.count:
+            app_latency[name] = round(histogram.sum / histogram.count * 1000, 2)
+
+    call_seconds = args.calls * args.duration
+    return {
+        "calls": args.calls,
+        "duration_s": args.duration,
+        "coalesce_ms": args.coalesce,
+        "wall_s": round(wall, 1),
+        "cpu_s": round(cpu, 2),
+        "cpu_percent_per_call": round(cpu / call_seconds * 100, 3),
+        "loop_lag_ms": percentiles(lag),
+        "rss_mb": round(rss_before / 2**20, 1),
+        "memory_per_call_kb": round((rss_peak - rss_before) / args.calls / 1024, 1),
+        "inbound_forwarding_ms": driver_stats.pop("inbound_ms"),
+        "outbound_forwarding_ms": driver_stats.pop("outbound_ms"),
+        "app_mean_latency_ms": app_latency,
+        **driver_stats,
+    }
+
+
+def _configure_environment(workdir, realtime_url, args):
+    # Must happen before the app is imported: settings are read at import time
+    os.environ.update(
+        {
+            "OPENAI_REALTIME_URL": realtime_url,
+            "OPENAI_POOL_SIZE": str(args.pool_size),
+            # Measure the requested load rather than the admission limit
+            "MAX_ACTIVE_CALLS": str(args.calls),
+            "INBOUND_COALESCE_MS": str(args.coalesce),
+            "LOOP_LAG_SHED_LIMIT": "0",
+            "TWILIO_FAKE_TRANSPORT": "1",
+            "CALL_STORE_URL": "memory://",
+            "POST_CALL_INPROCESS_WORKER": "0",
+            "POST_CALL_SPOOL": os.path.join(workdir, "post_call_jobs"),
+            "TRANSCRIPT_DIR": os.path.join(workdir, "transcripts"),
+            "RECORDING_DIR": os.path.join(workdir, "recordings"),
+            "APPOINTMENTS_LOG": os.path.join(workdir, "appointments.jsonl"),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per call")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds to start all")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--audio", help="Raw 8 kHz ulaw recording to stream")
+    parser.add_argument(
+        "--coalesce", type=int, default=0, help="Inbound append window in ms"
+    )
+    parser.add_argument("--call-request", default=SAMPLE_CALL)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    args.call_request = os.path.abspath(args.call_request)
+    if args.audio:
+        args.audio = os.path.abspath(args.audio)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    driver = multiprocessing.Process(
+        target=_driver_main, args=(child_conn, args), daemon=True
+    )
+    driver.start()
+    realtime_url = parent_conn.recv()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="voiceagent-bench-") as workdir:
+        _configure_environment(workdir, realtime_url, args)
+        from api.main import app
+
+        # Files the app writes relative to the working directory stay out of the repo
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(_run_app(args, parent_conn, app))
+        finally:
+            os.chdir(cwd)
+    driver.join(timeout=10)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()